@@ -0,0 +1,16 @@
+#!/usr/bin/env python3
+
+# Fixed positions for benchmarks, as move strings with the first piece
+# moving first. None of them is already won.
+
+CORPUS = {
+  'opening': ['', '33', '4423', '232213', '34062404'],
+  'middlegame': ['2142624532346565', '43352162606032224235', '535324323404405446253213'],
+  'endgame': ['356226422432362400433103405664', '26422364606633463000342242450553', '6456236231223362420636403444115510'],
+}
+
+
+def corpus_positions():
+  for phase, positions in CORPUS.items():
+    for moves in positions:
+      yield phase, moves
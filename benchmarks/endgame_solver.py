@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+
+# Time to solve positions exactly against the number of empty cells.
+# Run from the repository root: python -m benchmarks.endgame_solver
+
+import argparse
+import random
+import statistics
+import time
+
+from connect4_engine import (create_board, drop_piece, get_valid_locations,
+  last_move_wins, winning_cells)
+from connect4_solver import BOARD_CELLS, Solver
+
+
+def random_position(rng, empty_cells):
+  # Random games until one reaches empty_cells without either side winning.
+  # Random play nearly always leaves a win in one for one side or the
+  # other, which the solver settles without a real search, so positions
+  # with a playable winning cell for either side are skipped too.
+  while True:
+    board = create_board()
+    while board.moves < BOARD_CELLS - empty_cells:
+      column = rng.choice(get_valid_locations(board))
+      row = drop_piece(board, column)
+      if last_move_wins(board, row, column):
+        break
+    else:
+      config = board.config
+      playable = (board.mask + config.bottom_mask) & config.board_mask
+      threats = winning_cells(board.current, board.mask, config) | winning_cells(board.current ^ board.mask, board.mask, config)
+      if not threats & playable:
+        return board
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--min-empty', type=int, default=6)
+  parser.add_argument('--max-empty', type=int, default=20)
+  parser.add_argument('--step', type=int, default=2)
+  parser.add_argument('--positions', type=int, default=10)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  rng = random.Random(args.seed)
+  print('{:>6} {:>12} {:>12} {:>12}'.format('empty', 'mean ms', 'max ms', 'mean nodes'))
+  for empty_cells in range(args.min_empty, args.max_empty + 1, args.step):
+    times = []
+    nodes = []
+    for i in range(args.positions):
+      board = random_position(rng, empty_cells)
+      solver = Solver()
+      start = time.perf_counter()
+      solver.solve(board)
+      times.append((time.perf_counter() - start) * 1000)
+      nodes.append(solver.nodes)
+    print('{:>6} {:>12.2f} {:>12.2f} {:>12.0f}'.format(empty_cells, statistics.mean(times), max(times), statistics.mean(nodes)))
+
+
+if __name__ == '__main__':
+  main()
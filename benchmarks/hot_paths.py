@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+
+# Timings for the engine hot paths over the fixed position corpus, as JSON.
+# Run from the repository root:
+# python -m benchmarks.hot_paths --output bench.json
+
+import argparse
+import json
+import math
+import platform
+import sys
+import time
+import tracemalloc
+
+from benchmarks.corpus import corpus_positions
+from connect4_engine import (board_from_moves, get_valid_locations,
+  winning_move)
+from connect4_evaluation import IncrementalEvaluator
+from connect4_minimax import (BLACK_BOT_PIECE, POSITION_SCORER, SearchBudget,
+  minimax, score_position)
+from connect4_ordering import MoveOrdering
+from connect4_transposition import TranspositionTable
+
+
+MIN_DEPTH = 3
+MAX_DEPTH = 8
+# Seconds to spend repeating each fast call
+CALL_TIME = 0.2
+# Small enough that allocating it does not swamp shallow searches
+TABLE_MEMORY = 1024 * 1024
+
+
+def time_calls(call):
+  # Repeat call until CALL_TIME has passed, return seconds per call
+  calls = 0
+  start = time.perf_counter()
+  while True:
+    for i in range(100):
+      call()
+    calls += 100
+    elapsed = time.perf_counter() - start
+    if elapsed >= CALL_TIME:
+      return elapsed / calls
+
+
+def peak_memory(call):
+  tracemalloc.start()
+  tracemalloc.reset_peak()
+  before = tracemalloc.get_traced_memory()[0]
+  call()
+  peak = tracemalloc.get_traced_memory()[1]
+  tracemalloc.stop()
+  return peak - before
+
+
+def search(board, depth, table, budget=None):
+  # The caller makes the table, so neither the timings nor peak_bytes
+  # include allocating it
+  evaluator = IncrementalEvaluator(POSITION_SCORER, board)
+  return minimax(board, depth, -math.inf, math.inf, board.piece == BLACK_BOT_PIECE,
+    table=table, budget=budget, ordering=MoveOrdering(), evaluator=evaluator)
+
+
+def bench_calls(name, phase, moves, call):
+  return {
+    'benchmark': name,
+    'phase': phase,
+    'position': moves,
+    'seconds_per_call': time_calls(call),
+    'peak_bytes': peak_memory(call),
+  }
+
+
+def bench_minimax(phase, moves, depth):
+  board = board_from_moves(moves)
+  budget = SearchBudget()
+  table = TranspositionTable(TABLE_MEMORY)
+  start = time.perf_counter()
+  search(board, depth, table, budget)
+  elapsed = time.perf_counter() - start
+  table = TranspositionTable(TABLE_MEMORY)
+  return {
+    'benchmark': 'minimax',
+    'phase': phase,
+    'position': moves,
+    'depth': depth,
+    'nodes': budget.nodes,
+    'seconds_per_call': elapsed,
+    'nodes_per_second': budget.nodes / elapsed,
+    'peak_bytes': peak_memory(lambda: search(board, depth, table)),
+    'table_bytes': table.stats()['memory_bytes'],
+  }
+
+
+def run(min_depth=MIN_DEPTH, max_depth=MAX_DEPTH, phases=None):
+  results = []
+  for phase, moves in corpus_positions():
+    if phases and phase not in phases:
+      continue
+    board = board_from_moves(moves)
+    results.append(bench_calls('winning_move', phase, moves, lambda: winning_move(board, BLACK_BOT_PIECE)))
+    results.append(bench_calls('score_position', phase, moves, lambda: score_position(board, BLACK_BOT_PIECE)))
+    results.append(bench_calls('get_valid_locations', phase, moves, lambda: get_valid_locations(board)))
+    for depth in range(min_depth, max_depth + 1):
+      results.append(bench_minimax(phase, moves, depth))
+      print('{} {} depth {}'.format(phase, moves or '-', depth), file=sys.stderr)
+  return results
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Benchmark the engine hot paths.')
+  parser.add_argument('--min-depth', type=int, default=MIN_DEPTH)
+  parser.add_argument('--max-depth', type=int, default=MAX_DEPTH)
+  parser.add_argument('--phase', action='append', choices=['opening', 'middlegame', 'endgame'])
+  parser.add_argument('--output', default='-', help='JSON file, - for stdout')
+  args = parser.parse_args()
+
+  report = {
+    'python': platform.python_version(),
+    'machine': platform.machine(),
+    'results': run(args.min_depth, args.max_depth, args.phase),
+  }
+  text = json.dumps(report, indent=1)
+  if args.output == '-':
+    print(text)
+  else:
+    with open(args.output, 'w') as output:
+      output.write(text + '\n')
+
+
+if __name__ == '__main__':
+  main()
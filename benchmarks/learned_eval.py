@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+# Evaluations per second of a learned model against the heuristic, one
+# leaf at a time in minimax and in batches, then games between a minimax
+# using each. Run from the repository root:
+# python -m benchmarks.learned_eval --model model.npz
+
+import argparse
+import random
+import time
+
+from connect4_engine import (boards_to_array, create_board, drop_piece,
+  get_valid_locations, last_move_wins)
+from connect4_evaluation import IncrementalEvaluator
+from connect4_learned import LearnedEvaluator, load_model
+from connect4_minimax import BLACK_BOT_PIECE, iterative_deepening, position_scorer
+from benchmarks.one_ply_batch import random_boards
+
+
+BATCH_SIZES = [1, 100, 10000]
+GAMES = 20
+DEPTH = 4
+OPENING_PLIES = 2
+# Seconds to spend on each measurement
+RUN_TIME = 1.0
+
+
+def leaf_rate(evaluator, board):
+  # Drop, score and undo, as minimax does at the leaves
+  moves = [(column, board.heights[column]) for column in get_valid_locations(board)]
+  piece = board.piece
+  evaluations = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < RUN_TIME:
+    for column, row in moves:
+      board.play(column)
+      evaluator.drop(row, column, piece)
+      evaluator.score(BLACK_BOT_PIECE)
+      evaluator.undo(row, column, piece)
+      board.undo()
+    evaluations += len(moves)
+  return evaluations / (time.perf_counter() - start)
+
+
+def batch_rate(score, grids):
+  evaluations = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < RUN_TIME:
+    score(grids)
+    evaluations += len(grids)
+  return evaluations / (time.perf_counter() - start)
+
+
+def play_game(game, model, depth, opening_plies, seed):
+  # Returns the winner's evaluator, 'learned', 'heuristic' or None for a draw
+  rng = random.Random(seed * 1000003 + game)
+  board = create_board(rng.randint(1, 2), model.config)
+  # Colours alternate between games
+  learned_piece = 1 + game % 2
+  while board.moves < board.config.cells:
+    if board.moves < opening_plies:
+      column = rng.choice(get_valid_locations(board))
+    elif board.piece == learned_piece:
+      column = iterative_deepening(board, board.piece == BLACK_BOT_PIECE, max_depth=depth, solver_cells=0, evaluator=LearnedEvaluator(model, board))[0]
+    else:
+      column = iterative_deepening(board, board.piece == BLACK_BOT_PIECE, max_depth=depth, solver_cells=0)[0]
+    piece = board.piece
+    row = drop_piece(board, column)
+    if last_move_wins(board, row, column):
+      return 'learned' if piece == learned_piece else 'heuristic'
+  return None
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--model', required=True, help='model file from connect4_learned')
+  parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+  parser.add_argument('--games', type=int, default=GAMES)
+  parser.add_argument('--depth', type=int, default=DEPTH)
+  parser.add_argument('--opening-plies', type=int, default=OPENING_PLIES)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  model = load_model(args.model)
+  scorer = position_scorer(model.config)
+  board = random_boards(1, args.seed)[0]
+
+  print('{:>10} {:>14} {:>14}'.format('batch', 'heuristic/s', 'learned/s'))
+  print('{:>10} {:>14.0f} {:>14.0f}'.format('minimax', leaf_rate(IncrementalEvaluator(scorer, board), board), leaf_rate(LearnedEvaluator(model, board), board)))
+  boards = random_boards(max(args.batch_sizes), args.seed)
+  grids = boards_to_array(boards, model.config)
+  for batch_size in args.batch_sizes:
+    heuristic = batch_rate(lambda batch: scorer.score_grids(batch, BLACK_BOT_PIECE), grids[:batch_size])
+    learned = batch_rate(lambda batch: model.predict_grids(batch, BLACK_BOT_PIECE), grids[:batch_size])
+    print('{:>10} {:>14.0f} {:>14.0f}'.format(batch_size, heuristic, learned))
+
+  results = {'learned': 0, 'heuristic': 0, None: 0}
+  start = time.perf_counter()
+  for game in range(args.games):
+    results[play_game(game, model, args.depth, args.opening_plies, args.seed)] += 1
+  print('depth {} over {} games in {:.1f}s: learned won {}, heuristic won {}, drawn {}'.format(
+    args.depth, args.games, time.perf_counter() - start, results['learned'], results['heuristic'], results[None]))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+
+# Random playouts per second, one Python game at a time against numpy
+# batches, then inside the tree search at a few batch shapes. Run from the
+# repository root:
+# python -m benchmarks.mcts_playouts
+
+import argparse
+import random
+import time
+
+import numpy as np
+
+from connect4_engine import (board_from_moves, get_valid_locations,
+  last_move_wins)
+from connect4_mcts import LEAF_PLAYOUTS, mcts, random_playouts
+from connect4_minimax import BLACK_BOT_PIECE
+
+
+BATCH_SIZES = [1, 16, 256, 4096]
+BATCH_LEAVES = [1, 8, 32, 128]
+POSITION = '3324'
+# Seconds to spend on each measurement
+RUN_TIME = 1.0
+
+
+def loop_playout(board, rng):
+  board = board.copy()
+  while board.moves < board.config.cells:
+    column = rng.choice(get_valid_locations(board))
+    row = board.play(column)
+    if last_move_wins(board, row, column):
+      break
+
+
+def playouts_per_second(play, batch_size):
+  playouts = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < RUN_TIME:
+    play()
+    playouts += batch_size
+  return playouts / (time.perf_counter() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+  parser.add_argument('--batch-leaves', type=int, nargs='+', default=BATCH_LEAVES)
+  parser.add_argument('--position', default=POSITION, help='move string to play out from')
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  board = board_from_moves(args.position)
+  python_rng = random.Random(args.seed)
+  rng = np.random.default_rng(args.seed)
+
+  loop_rate = playouts_per_second(lambda: loop_playout(board, python_rng), 1)
+  print('{:>8} {:>12} {:>8}'.format('batch', 'playouts/s', 'speedup'))
+  print('{:>8} {:>12.0f} {:>8.2f}'.format('loop', loop_rate, 1.0))
+  for batch_size in args.batch_sizes:
+    current = np.full(batch_size, board.current, dtype=np.uint64)
+    mask = np.full(batch_size, board.mask, dtype=np.uint64)
+    rate = playouts_per_second(lambda: random_playouts(current, mask, board.config, rng), batch_size)
+    print('{:>8} {:>12.0f} {:>8.2f}'.format(batch_size, rate, rate / loop_rate))
+
+  print()
+  print('{:>8} {:>12} {:>7}'.format('leaves', 'playouts/s', 'column'))
+  for batch_leaves in args.batch_leaves:
+    column, value, column_score_list, played = mcts(board, board.piece == BLACK_BOT_PIECE, seconds=RUN_TIME, batch_leaves=batch_leaves, seed=args.seed)
+    print('{:>8} {:>12.0f} {:>7}'.format(batch_leaves, played / RUN_TIME, column))
+  print('{} playouts per leaf'.format(LEAF_PLAYOUTS))
+
+
+if __name__ == '__main__':
+  main()
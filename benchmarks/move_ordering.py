@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+
+# Node counts for minimax with and without move ordering.
+# Run from the repository root: python -m benchmarks.move_ordering
+
+import argparse
+import math
+import time
+
+from connect4_engine import board_from_moves
+from connect4_minimax import BLACK_BOT_PIECE, SearchBudget, minimax
+from connect4_ordering import MoveOrdering
+
+
+POSITIONS = ['', '33', '3324', '332415', '33224415']
+
+ORDERINGS = [
+  ('left-to-right', lambda: None),
+  ('center', lambda: MoveOrdering(killers=False, history=False)),
+  ('center+killers', lambda: MoveOrdering(history=False)),
+  ('center+killers+history', lambda: MoveOrdering()),
+]
+
+
+def count_nodes(moves, depth, ordering):
+  board = board_from_moves(moves)
+  budget = SearchBudget()
+  minimax(board, depth, -math.inf, math.inf, board.piece == BLACK_BOT_PIECE, budget=budget, ordering=ordering)
+  return budget.nodes
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--min-depth', type=int, default=5)
+  parser.add_argument('--max-depth', type=int, default=9)
+  args = parser.parse_args()
+
+  print('{:>5} {:>24} {:>12} {:>10} {:>9}'.format('depth', 'ordering', 'nodes', 'reduction', 'seconds'))
+  for depth in range(args.min_depth, args.max_depth + 1):
+    baseline = None
+    for name, make_ordering in ORDERINGS:
+      start = time.perf_counter()
+      # One ordering object per depth so history carries across positions
+      ordering = make_ordering()
+      nodes = sum(count_nodes(moves, depth, ordering) for moves in POSITIONS)
+      elapsed = time.perf_counter() - start
+      if baseline is None:
+        baseline = nodes
+      reduction = 1 - nodes / baseline
+      print('{:>5} {:>24} {:>12} {:>9.1%} {:>9.2f}'.format(depth, name, nodes, reduction, elapsed))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+
+# One-ply decisions per second, one child at a time against scoring every
+# child of a batch of parents in one call. Run from the repository root:
+# python -m benchmarks.one_ply_batch
+
+import argparse
+import random
+import time
+
+from connect4_engine import (EMPTY, create_board, drop_piece,
+  get_valid_locations, last_move_winner)
+from connect4_minimax import BLACK_BOT_PIECE, POSITION_SCORER, score_position
+
+
+BATCH_SIZES = [1, 10, 100, 1000, 10000]
+PLIES = 30
+# Seconds to spend on each measurement
+RUN_TIME = 1.0
+
+
+def random_boards(count, seed):
+  rng = random.Random(seed)
+  boards = []
+  while len(boards) < count:
+    board = create_board(rng.randint(1, 2))
+    for ply in range(rng.randint(0, PLIES)):
+      drop_piece(board, rng.choice(get_valid_locations(board)))
+      if last_move_winner(board) != EMPTY:
+        board.undo()
+        break
+    boards.append(board)
+  return boards
+
+
+def loop_decision(board, piece):
+  best_score = None
+  best_column = None
+  for column in get_valid_locations(board):
+    temp_board = board.copy()
+    drop_piece(temp_board, column)
+    score = score_position(temp_board, piece)
+    if best_score is None or score > best_score:
+      best_score = score
+      best_column = column
+  return best_column, best_score
+
+
+def decisions_per_second(decide, boards):
+  decisions = 0
+  start = time.perf_counter()
+  while time.perf_counter() - start < RUN_TIME:
+    decide(boards)
+    decisions += len(boards)
+  return decisions / (time.perf_counter() - start)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--batch-sizes', type=int, nargs='+', default=BATCH_SIZES)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  boards = random_boards(max(args.batch_sizes), args.seed)
+  for board in boards[:100]:
+    column, score = loop_decision(board, BLACK_BOT_PIECE)
+    best_columns, best_scores = POSITION_SCORER.best_children([board], BLACK_BOT_PIECE)
+    assert (column, score) == (best_columns[0], best_scores[0])
+
+  loop_rate = decisions_per_second(lambda batch: [loop_decision(board, BLACK_BOT_PIECE) for board in batch], boards[:100])
+  print('{:>6} {:>14} {:>8}'.format('batch', 'decisions/s', 'speedup'))
+  print('{:>6} {:>14.0f} {:>8.2f}'.format('loop', loop_rate, 1.0))
+  for batch_size in args.batch_sizes:
+    rate = decisions_per_second(lambda batch: POSITION_SCORER.best_children(batch, BLACK_BOT_PIECE), boards[:batch_size])
+    print('{:>6} {:>14.0f} {:>8.2f}'.format(batch_size, rate, rate / loop_rate))
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+
+# Speedup of the root-parallel search over worker counts and depths.
+# Run from the repository root: python -m benchmarks.parallel_search
+
+import argparse
+import math
+import time
+
+from connect4_engine import board_from_moves
+from connect4_evaluation import IncrementalEvaluator
+from connect4_minimax import BLACK_BOT_PIECE, POSITION_SCORER, minimax
+from connect4_ordering import MoveOrdering
+from connect4_parallel import create_executor, parallel_minimax
+from connect4_transposition import TranspositionTable
+
+
+POSITION = '3324'
+
+
+def serial_search(board, depth):
+  evaluator = IncrementalEvaluator(POSITION_SCORER, board)
+  return minimax(board, depth, -math.inf, math.inf, board.piece == BLACK_BOT_PIECE, table=TranspositionTable(), ordering=MoveOrdering(), evaluator=evaluator)
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--min-depth', type=int, default=6)
+  parser.add_argument('--max-depth', type=int, default=10)
+  parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+  parser.add_argument('--position', default=POSITION, help='move string to search from')
+  args = parser.parse_args()
+
+  board = board_from_moves(args.position)
+  executors = {workers: create_executor(workers) for workers in args.workers}
+
+  print('{:>5} {:>8} {:>9} {:>8} {:>7} {:>6}'.format('depth', 'workers', 'seconds', 'speedup', 'column', 'match'))
+  for depth in range(args.min_depth, args.max_depth + 1):
+    start = time.perf_counter()
+    serial_column, serial_value, _ = serial_search(board, depth)
+    serial_time = time.perf_counter() - start
+    print('{:>5} {:>8} {:>9.2f} {:>8.2f} {:>7} {:>6}'.format(depth, 'serial', serial_time, 1.0, serial_column, ''))
+
+    for workers in args.workers:
+      start = time.perf_counter()
+      column, value, _ = parallel_minimax(board, depth, board.piece == BLACK_BOT_PIECE, executors[workers], workers)
+      elapsed = time.perf_counter() - start
+      match = column == serial_column and value == serial_value
+      print('{:>5} {:>8} {:>9.2f} {:>8.2f} {:>7} {:>6}'.format(depth, workers, elapsed, serial_time / elapsed, column, str(match)))
+
+  for executor in executors.values():
+    executor.shutdown()
+
+
+if __name__ == '__main__':
+  main()
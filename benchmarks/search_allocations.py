@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+
+# Memory allocated by minimax while it searches, measured with tracemalloc.
+# Run from the repository root: python -m benchmarks.search_allocations
+
+import argparse
+import math
+import tracemalloc
+
+from connect4_engine import board_from_moves
+from connect4_evaluation import IncrementalEvaluator
+from connect4_minimax import BLACK_BOT_PIECE, POSITION_SCORER, SearchBudget, minimax
+
+
+POSITIONS = ['', '33', '3324', '332415', '33224415']
+
+
+def measure(moves, depth):
+  board = board_from_moves(moves)
+  evaluator = IncrementalEvaluator(POSITION_SCORER, board)
+  budget = SearchBudget()
+  tracemalloc.start()
+  before = tracemalloc.get_traced_memory()[0]
+  tracemalloc.reset_peak()
+  minimax(board, depth, -math.inf, math.inf, board.piece == BLACK_BOT_PIECE, budget=budget, evaluator=evaluator)
+  current, peak = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  return budget.nodes, peak - before, current - before
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument('--depth', type=int, default=6)
+  args = parser.parse_args()
+
+  print('{:>10} {:>10} {:>12} {:>14} {:>12}'.format('position', 'nodes', 'peak bytes', 'bytes / node', 'retained'))
+  for moves in POSITIONS:
+    nodes, peak, retained = measure(moves, args.depth)
+    print('{:>10} {:>10} {:>12} {:>14.2f} {:>12}'.format(moves or '-', nodes, peak, peak / nodes, retained))
+
+
+if __name__ == '__main__':
+  main()
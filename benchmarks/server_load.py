@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+
+# Open-loop load test of the analysis server at a fixed request rate,
+# reporting latency percentiles as JSON. Starts a local server unless
+# --url is given. Run from the repository root:
+# python -m benchmarks.server_load --rate 50 --duration 10
+
+import argparse
+import concurrent.futures
+import http.client
+import json
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+
+from connect4_engine import EMPTY, create_board, get_valid_locations, last_move_winner
+
+
+RATE = 50
+DURATION = 10.0
+POSITIONS = 200
+PLIES = 12
+CONCURRENCY = 64
+STARTUP_TIMEOUT = 30.0
+
+
+def random_positions(count, plies, seed):
+  # Distinct random openings, none of them already won
+  rng = random.Random(seed)
+  positions = set()
+  while len(positions) < count:
+    board = create_board()
+    moves = []
+    for ply in range(rng.randint(0, plies)):
+      column = rng.choice(get_valid_locations(board))
+      board.play(column)
+      if last_move_winner(board) != EMPTY:
+        break
+      moves.append(str(column))
+    else:
+      positions.add(''.join(moves))
+  return sorted(positions)
+
+
+def free_port():
+  with socket.socket() as probe:
+    probe.bind(('127.0.0.1', 0))
+    return probe.getsockname()[1]
+
+
+def start_server(args):
+  port = free_port()
+  command = [sys.executable, 'connect4_server.py', '--port', str(port), '--depth', str(args.depth)]
+  if args.workers is not None:
+    command += ['--workers', str(args.workers)]
+  process = subprocess.Popen(command, stderr=subprocess.DEVNULL)
+  url = 'http://127.0.0.1:{}'.format(port)
+  deadline = time.perf_counter() + STARTUP_TIMEOUT
+  while time.perf_counter() < deadline:
+    try:
+      request('GET', url, '/health')
+      return process, url
+    except OSError:
+      time.sleep(0.1)
+  process.kill()
+  raise RuntimeError('server did not start within {}s'.format(STARTUP_TIMEOUT))
+
+
+_connections = threading.local()
+
+
+def request(method, url, path, body=None):
+  # One keep-alive connection per client thread
+  connection = getattr(_connections, 'connection', None)
+  if connection is None:
+    parts = urllib.parse.urlsplit(url)
+    connection = http.client.HTTPConnection(parts.hostname, parts.port, timeout=60)
+    _connections.connection = connection
+  try:
+    connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    data = response.read()
+  except (OSError, http.client.HTTPException):
+    connection.close()
+    _connections.connection = None
+    raise
+  return response.status, data
+
+
+def send(url, body, scheduled):
+  # Latency runs from when the request was due, so a slow server cannot
+  # hide its queueing by delaying later requests
+  try:
+    status, data = request('POST', url, '/analyze', body)
+  except (OSError, http.client.HTTPException):
+    status = None
+  return time.perf_counter() - scheduled, status
+
+
+def percentile(values, fraction):
+  if not values:
+    return None
+  values = sorted(values)
+  return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Load test the analysis server.')
+  parser.add_argument('--url', help='server to test, e.g. http://127.0.0.1:8400')
+  parser.add_argument('--rate', type=float, default=RATE, help='requests per second')
+  parser.add_argument('--duration', type=float, default=DURATION, help='seconds')
+  parser.add_argument('--positions', type=int, default=POSITIONS, help='distinct positions to cycle through')
+  parser.add_argument('--plies', type=int, default=PLIES, help='longest random opening')
+  parser.add_argument('--depth', type=int, default=4)
+  parser.add_argument('--workers', type=int, default=None, help='workers for a started server')
+  parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='client threads')
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  process = None
+  url = args.url
+  if url is None:
+    process, url = start_server(args)
+
+  positions = random_positions(args.positions, args.plies, args.seed)
+  rng = random.Random(args.seed)
+  total = int(args.rate * args.duration)
+  futures = []
+  try:
+    with concurrent.futures.ThreadPoolExecutor(args.concurrency) as clients:
+      start = time.perf_counter()
+      for number in range(total):
+        scheduled = start + number / args.rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+          time.sleep(delay)
+        body = json.dumps({'moves': rng.choice(positions), 'depth': args.depth})
+        futures.append(clients.submit(send, url, body, scheduled))
+      results = [future.result() for future in futures]
+      elapsed = time.perf_counter() - start
+    stats = json.loads(request('GET', url, '/stats')[1])
+  finally:
+    if process is not None:
+      process.terminate()
+      process.wait()
+
+  latencies = [latency for latency, status in results if status == 200]
+  report = {
+    'url': url,
+    'target_rate': args.rate,
+    'achieved_rate': round(len(results) / elapsed, 2),
+    'requests': len(results),
+    'errors': len(results) - len(latencies),
+    'depth': args.depth,
+    'positions': len(positions),
+    'p50_ms': None if not latencies else round(percentile(latencies, 0.50) * 1000, 2),
+    'p99_ms': None if not latencies else round(percentile(latencies, 0.99) * 1000, 2),
+    'max_ms': None if not latencies else round(max(latencies) * 1000, 2),
+    'server': stats,
+  }
+  print(json.dumps(report, indent=1))
+
+
+if __name__ == '__main__':
+  main()
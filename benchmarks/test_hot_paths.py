@@ -0,0 +1,42 @@
+# pytest-benchmark versions of benchmarks/hot_paths.py:
+# pytest benchmarks --benchmark-json bench.json
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from benchmarks.corpus import corpus_positions
+from benchmarks.hot_paths import MAX_DEPTH, MIN_DEPTH, TABLE_MEMORY, search
+from connect4_engine import board_from_moves, get_valid_locations, winning_move
+from connect4_minimax import BLACK_BOT_PIECE, score_position
+from connect4_transposition import TranspositionTable
+
+
+POSITIONS = list(corpus_positions())
+IDS = ['{}-{}'.format(phase, moves or 'empty') for phase, moves in POSITIONS]
+
+
+@pytest.mark.parametrize('phase,moves', POSITIONS, ids=IDS)
+def test_winning_move(benchmark, phase, moves):
+  board = board_from_moves(moves)
+  benchmark(winning_move, board, BLACK_BOT_PIECE)
+
+
+@pytest.mark.parametrize('phase,moves', POSITIONS, ids=IDS)
+def test_score_position(benchmark, phase, moves):
+  board = board_from_moves(moves)
+  benchmark(score_position, board, BLACK_BOT_PIECE)
+
+
+@pytest.mark.parametrize('phase,moves', POSITIONS, ids=IDS)
+def test_get_valid_locations(benchmark, phase, moves):
+  board = board_from_moves(moves)
+  benchmark(get_valid_locations, board)
+
+
+@pytest.mark.parametrize('depth', range(MIN_DEPTH, MAX_DEPTH + 1))
+@pytest.mark.parametrize('phase,moves', POSITIONS, ids=IDS)
+def test_minimax(benchmark, phase, moves, depth):
+  board = board_from_moves(moves)
+  # A fresh table each round, made outside the timed call
+  benchmark.pedantic(search, setup=lambda: ((board, depth, TranspositionTable(TABLE_MEMORY)), {}), rounds=3)
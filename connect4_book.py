@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+
+# Opening book of deeply searched positions, stored as fixed-width records
+# sorted by position hash and read through mmap with a binary search. A
+# position and its mirror are stored once, under the smaller of the two
+# hashes, with the best column as seen from that side.
+# python connect4_book.py build --plies 4 --depth 8
+# python connect4_book.py probe 3324
+
+import argparse
+import mmap
+import multiprocessing
+import struct
+import sys
+import time
+
+from connect4_engine import (FIRST_PIECE, SECOND_PIECE, board_from_moves,
+  create_board, drop_piece, get_valid_locations, last_move_wins)
+from connect4_minimax import BLACK_BOT_PIECE, iterative_deepening
+from connect4_ordering import MoveOrdering
+from connect4_transposition import TranspositionTable
+
+
+BOOK_PATH = 'connect4_book.bin'
+BOOK_PLIES = 4
+BOOK_DEPTH = 8
+
+BOOK_MAGIC = b'C4BK'
+BOOK_VERSION = 2
+# Magic, version and record count
+HEADER = struct.Struct('<4sIQ')
+# Canonical position hash, value, best column and search depth
+RECORD = struct.Struct('<QiBB2x')
+KEY = struct.Struct('<Q')
+
+
+class OpeningBook:
+
+  def __init__(self, path=BOOK_PATH):
+    self.file = open(path, 'rb')
+    self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+    magic, version, self.count = HEADER.unpack_from(self.data, 0)
+    if magic != BOOK_MAGIC or version != BOOK_VERSION:
+      self.close()
+      raise ValueError('{} is not a version {} opening book'.format(path, BOOK_VERSION))
+
+  def lookup(self, board):
+    # Returns (column, value, depth) or None if the position is not in the book
+    key, mirrored = board.canonical_hash()
+    low = 0
+    high = self.count
+    while low < high:
+      middle = (low + high) // 2
+      middle_key = KEY.unpack_from(self.data, HEADER.size + middle * RECORD.size)[0]
+      if middle_key < key:
+        low = middle + 1
+      elif middle_key > key:
+        high = middle
+      else:
+        key, value, column, depth = RECORD.unpack_from(self.data, HEADER.size + middle * RECORD.size)
+        if mirrored:
+          column = board.config.mirror_column(column)
+        return column, value, depth
+    return None
+
+  def close(self):
+    self.data.close()
+    self.file.close()
+
+
+def open_book(path=BOOK_PATH):
+  try:
+    return OpeningBook(path)
+  except (OSError, ValueError):
+    return None
+
+
+def book_positions(plies):
+  # (first piece, move string) of every distinct position up to plies
+  # moves deep that is not already won, for either piece moving first,
+  # counting a position and its mirror once
+  positions = {}
+
+  def visit(board, piece, moves):
+    key = board.canonical_hash()[0]
+    if key in positions:
+      return
+    positions[key] = (piece, moves)
+    if len(moves) >= plies:
+      return
+    for column in get_valid_locations(board):
+      row = drop_piece(board, column)
+      if not last_move_wins(board, row, column):
+        visit(board, piece, moves + str(column))
+      board.undo()
+
+  for piece in (FIRST_PIECE, SECOND_PIECE):
+    visit(create_board(piece), piece, '')
+  return list(positions.values())
+
+
+def search_book_position(args):
+  piece, moves, depth = args
+  board = board_from_moves(moves, piece)
+  column, value, column_score_list, reached = iterative_deepening(board, board.piece == BLACK_BOT_PIECE,
+    max_depth=depth, table=TranspositionTable(), ordering=MoveOrdering())
+  key, mirrored = board.canonical_hash()
+  if mirrored:
+    column = board.config.mirror_column(column)
+  return key, value, column, reached
+
+
+def write_book(path, records):
+  records.sort()
+  with open(path, 'wb') as book_file:
+    book_file.write(HEADER.pack(BOOK_MAGIC, BOOK_VERSION, len(records)))
+    for key, value, column, depth in records:
+      book_file.write(RECORD.pack(key, value, column, depth))
+
+
+def build_book(path, plies, depth, workers):
+  jobs = [(piece, moves, depth) for piece, moves in book_positions(plies)]
+  records = []
+  start = time.perf_counter()
+  with multiprocessing.Pool(workers) as pool:
+    for record in pool.imap_unordered(search_book_position, jobs, chunksize=8):
+      records.append(record)
+      if len(records) % 100 == 0:
+        print('{}/{} positions'.format(len(records), len(jobs)), file=sys.stderr)
+  write_book(path, records)
+  print('wrote {} positions to {} in {:.1f}s'.format(len(records), path, time.perf_counter() - start), file=sys.stderr)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Build or probe the opening book.')
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  build_parser = subparsers.add_parser('build')
+  build_parser.add_argument('--plies', type=int, default=BOOK_PLIES)
+  build_parser.add_argument('--depth', type=int, default=BOOK_DEPTH)
+  build_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+  build_parser.add_argument('--output', default=BOOK_PATH)
+  probe_parser = subparsers.add_parser('probe')
+  probe_parser.add_argument('moves', nargs='?', default='')
+  probe_parser.add_argument('--first', type=int, default=FIRST_PIECE)
+  probe_parser.add_argument('--book', default=BOOK_PATH)
+  args = parser.parse_args()
+
+  if args.command == 'build':
+    build_book(args.output, args.plies, args.depth, args.workers)
+  else:
+    book = OpeningBook(args.book)
+    print(book.lookup(board_from_moves(args.moves, args.first)))
+    book.close()
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+
+# Self-play training positions in sharded, append-only files of
+# fixed-width records, read back through numpy memmaps without copying.
+# python connect4_dataset.py generate --games 1000 --player minimax --output data
+# python connect4_dataset.py info data
+
+import argparse
+import glob
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import time
+
+import numpy as np
+
+from connect4_engine import (COLUMN_COUNT, DEFAULT_CONFIG, EMPTY, ROW_COUNT,
+  WINDOW_LENGTH, board_config, create_board, drop_piece, get_valid_locations,
+  last_move_wins)
+from connect4_minimax import BLACK_BOT_PIECE, iterative_deepening
+from connect4_ordering import MoveOrdering
+from connect4_solver import Solver
+from connect4_transposition import TranspositionTable
+
+
+DATASET_MAGIC = b'C4DS'
+DATASET_VERSION = 1
+# Magic, version, columns, rows and connect length, padded to 16 bytes
+HEADER = struct.Struct('<4sHBBB7x')
+# current and mask as in Position, the search value and final result for
+# the side to move, and the side to move, padded to 24 bytes. Random
+# games have no search value.
+RECORD = np.dtype({
+  'names': ['current', 'mask', 'value', 'result', 'piece'],
+  'formats': ['<u8', '<u8', '<i4', 'i1', 'u1'],
+  'offsets': [0, 8, 16, 20, 21],
+  'itemsize': 24,
+})
+NO_VALUE = np.iinfo(np.int32).min
+
+SHARD_PATTERN = 'shard-{:05d}.c4ds'
+SHARD_RECORDS = 1 << 20
+PLAYERS = ('minimax', 'random')
+GAME_DEPTH = 4
+OPENING_PLIES = 2
+TABLE_MEMORY = 4 * 1024 * 1024
+
+_worker_table = None
+_worker_solver = None
+
+
+def play_game(game, seed, player, depth, opening_plies, size=(COLUMN_COUNT, ROW_COUNT, WINDOW_LENGTH)):
+  # Returns one record per position before each move of the game
+  global _worker_table, _worker_solver
+  rng = random.Random(seed * 1000003 + game)
+  board = create_board(rng.randint(1, 2), board_config(*size))
+  table = None
+  if player == 'minimax':
+    # Allocated once per worker; clearing it is far cheaper
+    if _worker_table is None:
+      _worker_table = TranspositionTable(TABLE_MEMORY)
+      _worker_solver = Solver()
+    table = _worker_table
+    table.clear()
+  ordering = MoveOrdering() if player == 'minimax' else None
+  positions = []
+  winner = EMPTY
+
+  while board.moves < board.config.cells:
+    value = NO_VALUE
+    if player == 'random' or board.moves < opening_plies:
+      column = rng.choice(get_valid_locations(board))
+    else:
+      maximizingPlayer = board.piece == BLACK_BOT_PIECE
+      column, value = iterative_deepening(board, maximizingPlayer, max_depth=depth, table=table, ordering=ordering, solver=_worker_solver)[:2]
+      # Stored for the side to move like the result
+      value = int(value if maximizingPlayer else -value)
+    positions.append((board.current, board.mask, value, 0, board.piece))
+
+    piece = board.piece
+    row = drop_piece(board, column)
+    if last_move_wins(board, row, column):
+      winner = piece
+      break
+
+  records = np.array(positions, dtype=RECORD)
+  if winner != EMPTY:
+    records['result'] = np.where(records['piece'] == winner, 1, -1)
+  return records
+
+
+def play_game_args(args):
+  return play_game(*args)
+
+
+def shard_paths(directory):
+  return sorted(glob.glob(os.path.join(directory, SHARD_PATTERN.replace('{:05d}', '[0-9]' * 5))))
+
+
+def shard_number(path):
+  return int(os.path.basename(path)[len('shard-'):-len('.c4ds')])
+
+
+class ShardWriter:
+  # Appends records to the current shard and starts a new one every
+  # shard_records records. Existing shards are never rewritten, so a new
+  # run continues after the last shard in the directory.
+
+  def __init__(self, directory, size, shard_records=SHARD_RECORDS):
+    os.makedirs(directory, exist_ok=True)
+    self.directory = directory
+    self.size = size
+    self.shard_records = shard_records
+    # Numbered after the highest shard, so gaps are never filled in
+    self.shard = max((shard_number(path) for path in shard_paths(directory)), default=-1) + 1
+    self.file = None
+    self.written = 0
+    self.total = 0
+
+  def open_shard(self):
+    path = os.path.join(self.directory, SHARD_PATTERN.format(self.shard))
+    self.shard += 1
+    # Fails rather than appending if another writer took the number
+    self.file = open(path, 'xb')
+    self.file.write(HEADER.pack(DATASET_MAGIC, DATASET_VERSION, *self.size))
+    self.written = 0
+
+  def write(self, records):
+    while len(records):
+      if self.file is None or self.written == self.shard_records:
+        self.close()
+        self.open_shard()
+      chunk = records[:self.shard_records - self.written]
+      chunk.tofile(self.file)
+      self.written += len(chunk)
+      self.total += len(chunk)
+      records = records[len(chunk):]
+
+  def close(self):
+    if self.file is not None:
+      self.file.close()
+      self.file = None
+
+
+def read_shard(path):
+  # Returns (records, (columns, rows, connect)) with records memory mapped
+  with open(path, 'rb') as shard_file:
+    header = shard_file.read(HEADER.size)
+  if len(header) < HEADER.size:
+    raise ValueError('{} is too short for a dataset shard'.format(path))
+  magic, version, columns, rows, connect = HEADER.unpack(header)
+  if magic != DATASET_MAGIC or version != DATASET_VERSION:
+    raise ValueError('{} is not a version {} dataset shard'.format(path, DATASET_VERSION))
+  count = (os.path.getsize(path) - HEADER.size) // RECORD.itemsize
+  if not count:
+    return np.zeros(0, dtype=RECORD), (columns, rows, connect)
+  records = np.memmap(path, dtype=RECORD, mode='r', offset=HEADER.size, shape=(count,))
+  return records, (columns, rows, connect)
+
+
+def read_dataset(directory):
+  # Memory mapped records of every shard, one array per shard
+  return [read_shard(path)[0] for path in shard_paths(directory)]
+
+
+def iterate_batches(directory, batch_size):
+  # Views of batch_size records; batches do not span shards
+  for records in read_dataset(directory):
+    for start in range(0, len(records), batch_size):
+      yield records[start:start + batch_size]
+
+
+def record_planes(records, config=DEFAULT_CONFIG):
+  # Stones of the side to move and of the opponent as (n, 2, rows, columns)
+  cell_shifts = config.cell_shifts
+  current = records['current'][:, None, None]
+  opponent = (records['current'] ^ records['mask'])[:, None, None]
+  planes = np.empty((len(records), 2) + cell_shifts.shape, dtype=np.uint8)
+  planes[:, 0] = (current >> cell_shifts) & np.uint64(1)
+  planes[:, 1] = (opponent >> cell_shifts) & np.uint64(1)
+  return planes
+
+
+def generate(args):
+  size = (args.width, args.height, args.connect)
+  jobs = ((game, args.seed, args.player, args.depth, args.opening_plies, size) for game in range(args.games))
+  writer = ShardWriter(args.output, size, args.shard_records)
+  start = time.perf_counter()
+  try:
+    with multiprocessing.Pool(args.workers) as pool:
+      for game, records in enumerate(pool.imap_unordered(play_game_args, jobs, chunksize=args.chunk_size), 1):
+        writer.write(records)
+        if game % args.progress == 0:
+          elapsed = time.perf_counter() - start
+          print('{} games, {} positions, {:.0f} positions/s'.format(game, writer.total, writer.total / elapsed), file=sys.stderr)
+  finally:
+    writer.close()
+  elapsed = time.perf_counter() - start
+  print('wrote {} positions from {} games in {:.1f}s'.format(writer.total, args.games, elapsed), file=sys.stderr)
+
+
+def info(args):
+  start = time.perf_counter()
+  shards = read_dataset(args.directory)
+  count = sum(len(records) for records in shards)
+  results = {-1: 0, 0: 0, 1: 0}
+  valued = 0
+  # Touches every record, so this measures the read rate as well
+  for records in shards:
+    counts = np.bincount(records['result'].astype(np.int64) + 1, minlength=3)
+    for result in results:
+      results[result] += int(counts[result + 1])
+    valued += int(np.count_nonzero(records['value'] != NO_VALUE))
+  elapsed = time.perf_counter() - start
+  print('{} shards, {} positions, {} with a search value'.format(len(shards), count, valued))
+  print('side to move won {} drew {} lost {}'.format(results[1], results[0], results[-1]))
+  print('read in {:.3f}s, {:.0f} positions/s, {:.1f} MB/s'.format(elapsed, count / elapsed if elapsed else 0.0,
+    count * RECORD.itemsize / 1e6 / elapsed if elapsed else 0.0))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Generate or inspect self-play training data.')
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  generate_parser = subparsers.add_parser('generate')
+  generate_parser.add_argument('--games', type=int, default=100)
+  generate_parser.add_argument('--player', choices=PLAYERS, default='minimax')
+  generate_parser.add_argument('--depth', type=int, default=GAME_DEPTH)
+  generate_parser.add_argument('--opening-plies', type=int, default=OPENING_PLIES, help='random moves before the search takes over')
+  generate_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+  generate_parser.add_argument('--chunk-size', type=int, default=16, help='games handed to a worker at a time')
+  generate_parser.add_argument('--seed', type=int, default=0)
+  generate_parser.add_argument('--shard-records', type=int, default=SHARD_RECORDS)
+  generate_parser.add_argument('--progress', type=int, default=1000, help='report every this many games')
+  generate_parser.add_argument('--width', type=int, default=COLUMN_COUNT)
+  generate_parser.add_argument('--height', type=int, default=ROW_COUNT)
+  generate_parser.add_argument('--connect', type=int, default=WINDOW_LENGTH)
+  generate_parser.add_argument('--output', required=True, help='directory for the shards')
+  info_parser = subparsers.add_parser('info')
+  info_parser.add_argument('directory')
+  args = parser.parse_args()
+
+  if args.command == 'generate':
+    try:
+      board_config(args.width, args.height, args.connect)
+    except ValueError as error:
+      parser.error(str(error))
+    generate(args)
+  else:
+    info(args)
+
+
+if __name__ == '__main__':
+  main()
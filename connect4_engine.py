@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+
+import random
+
+import numpy as np
+
+
+ROW_COUNT = 6
+COLUMN_COUNT = 7
+
+EMPTY = 0
+FIRST_PIECE = 1
+SECOND_PIECE = 2
+
+WINDOW_LENGTH = 4
+
+BITBOARD_BITS = 64
+
+# Fixed seed so position hashes are stable across runs and processes
+ZOBRIST_SEED = 0xC0447
+
+
+class BoardConfig:
+  # Masks and window tables for one board size and connect length, built
+  # once and shared by every position on that board. Each column uses
+  # row_count bits plus one guard bit on top, bottom row first, so
+  # column_count * (row_count + 1) must fit in a 64 bit bitboard.
+
+  def __init__(self, column_count=COLUMN_COUNT, row_count=ROW_COUNT, window_length=WINDOW_LENGTH):
+    if column_count * (row_count + 1) > BITBOARD_BITS:
+      raise ValueError('a {}x{} board does not fit in {} bits'.format(column_count, row_count, BITBOARD_BITS))
+    if not 1 < window_length <= max(column_count, row_count):
+      raise ValueError('cannot connect {} on a {}x{} board'.format(window_length, column_count, row_count))
+
+    self.column_count = column_count
+    self.row_count = row_count
+    self.window_length = window_length
+    self.cells = column_count * row_count
+    self.column_height = row_count + 1
+
+    self.bottom_mask = sum(1 << (c * self.column_height) for c in range(column_count))
+    self.board_mask = self.bottom_mask * ((1 << row_count) - 1)
+    self.top_masks = [1 << (row_count - 1 + c * self.column_height) for c in range(column_count)]
+    self.column_masks = [((1 << row_count) - 1) << (c * self.column_height) for c in range(column_count)]
+
+    # Bit shifts for vertical, horizontal and both diagonal directions
+    self.directions = (1, self.column_height, self.column_height - 1, self.column_height + 1)
+
+    # Columns from the center outwards, left of center first on ties
+    self.center_order = sorted(range(column_count), key=lambda c: abs(2 * c - (column_count - 1)))
+    self.center_rank = [self.center_order.index(c) for c in range(column_count)]
+
+    self.windows = self.build_windows()
+    self.window_masks = [sum(self.cell_bit(r, c) for r, c in window) for window in self.windows]
+
+    # Flat grid index of every window cell, shape (windows, window_length)
+    self.window_index = np.array([[r * column_count + c for r, c in window] for window in self.windows], dtype=np.intp)
+
+    # Bit position of every grid cell, used to unpack bitboards into arrays
+    self.cell_shifts = np.array([[c * self.column_height + r for c in range(column_count)] for r in range(row_count)], dtype=np.uint64)
+
+    # Masks of every window passing through each cell, indexed [row][column]
+    self.cell_window_masks = [[[] for c in range(column_count)] for r in range(row_count)]
+    for window, window_mask in zip(self.windows, self.window_masks):
+      for r, c in window:
+        self.cell_window_masks[r][c].append(window_mask)
+
+    zobrist_random = random.Random(ZOBRIST_SEED)
+    self.zobrist_keys = [[zobrist_random.getrandbits(64) for i in range(column_count * self.column_height)] for piece in range(3)]
+    self.zobrist_side = zobrist_random.getrandbits(64)
+    # Keys of the mirrored cell, so a position's mirror hash updates alongside its hash
+    self.mirror_keys = [[keys[self.mirror_index(i)] for i in range(len(keys))] for keys in self.zobrist_keys]
+
+    # Column pairs a left-right mirror swaps, as (left mask, right mask,
+    # shift), and the middle column it leaves in place
+    slot = (1 << self.column_height) - 1
+    self.mirror_pairs = [(slot << c * self.column_height, slot << (column_count - 1 - c) * self.column_height,
+      (column_count - 1 - 2 * c) * self.column_height) for c in range(column_count // 2)]
+    self.middle_mask = slot << (column_count // 2) * self.column_height if column_count % 2 else 0
+
+  def __reduce__(self):
+    # Positions sent to other processes share that process's cached config
+    return board_config, (self.column_count, self.row_count, self.window_length)
+
+  def cell_bit(self, row, column):
+    return 1 << (column * self.column_height + row)
+
+  def mirror_index(self, index):
+    column, row = divmod(index, self.column_height)
+    return (self.column_count - 1 - column) * self.column_height + row
+
+  def mirror_bits(self, bits):
+    # Columns never carry into each other, so this also mirrors current + mask
+    mirrored = bits & self.middle_mask
+    for left, right, shift in self.mirror_pairs:
+      mirrored |= (bits & left) << shift | (bits & right) >> shift
+    return mirrored
+
+  def mirror_column(self, column):
+    return self.column_count - 1 - column
+
+  def build_windows(self):
+    windows = []
+    # Horizontal, vertical, positive slope and negative slope, in that order
+    for dr, dc in ((0, 1), (1, 0), (1, 1), (-1, 1)):
+      for r in range(self.row_count):
+        for c in range(self.column_count):
+          end_r = r + dr * (self.window_length - 1)
+          end_c = c + dc * (self.window_length - 1)
+          if 0 <= end_r < self.row_count and end_c < self.column_count:
+            windows.append([(r + dr * i, c + dc * i) for i in range(self.window_length)])
+    return windows
+
+
+_board_configs = {}
+
+
+def board_config(column_count=COLUMN_COUNT, row_count=ROW_COUNT, window_length=WINDOW_LENGTH):
+  key = (column_count, row_count, window_length)
+  config = _board_configs.get(key)
+  if config is None:
+    config = _board_configs[key] = BoardConfig(*key)
+  return config
+
+
+DEFAULT_CONFIG = board_config()
+
+
+def alignment(bits, config=DEFAULT_CONFIG):
+  length = config.window_length
+  if length == 4:
+    for shift in config.directions:
+      pairs = bits & (bits >> shift)
+      if pairs & (pairs >> (2 * shift)):
+        return True
+    return False
+  # Doubles the run length each step until it covers the whole line
+  for shift in config.directions:
+    run = bits
+    covered = 1
+    while covered < length:
+      step = min(covered, length - covered)
+      run &= run >> (step * shift)
+      covered += step
+    if run:
+      return True
+  return False
+
+
+def alignments(bits, config=DEFAULT_CONFIG):
+  # alignment over a uint64 array, one bool per element
+  found = np.zeros(bits.shape, dtype=bool)
+  length = config.window_length
+  for shift in config.directions:
+    if length == 4:
+      pairs = bits & (bits >> np.uint64(shift))
+      run = pairs & (pairs >> np.uint64(2 * shift))
+    else:
+      run = bits
+      covered = 1
+      while covered < length:
+        step = min(covered, length - covered)
+        run = run & (run >> np.uint64(step * shift))
+        covered += step
+    found |= run != 0
+  return found
+
+
+def winning_cells(bits, mask, config=DEFAULT_CONFIG):
+  # Empty cells that would complete a line for the stones in bits
+  cells = 0
+  length = config.window_length
+  if length == 4:
+    for shift in config.directions:
+      pairs = (bits << shift) & (bits << (2 * shift))
+      cells |= pairs & (bits << (3 * shift))
+      cells |= pairs & (bits >> shift)
+      pairs = (bits >> shift) & (bits >> (2 * shift))
+      cells |= pairs & (bits << shift)
+      cells |= pairs & (bits >> (3 * shift))
+  else:
+    for shift in config.directions:
+      # gap is the place of the missing cell within the line
+      for gap in range(length):
+        line = -1
+        for place in range(length):
+          if place < gap:
+            line &= bits << ((gap - place) * shift)
+          elif place > gap:
+            line &= bits >> ((place - gap) * shift)
+        cells |= line
+  return cells & (config.board_mask ^ mask)
+
+
+class Position:
+  # current holds the stones of the side to move, mask holds every stone
+
+  def __init__(self, piece=FIRST_PIECE, config=DEFAULT_CONFIG):
+    self.config = config
+    self.current = 0
+    self.mask = 0
+    self.heights = [0] * config.column_count
+    self.moves = 0
+    self.piece = piece
+    self.history = []
+    self.hash = config.zobrist_side if piece == SECOND_PIECE else 0
+    # The hash of the left-right mirror of the position
+    self.mirror_hash = self.hash
+
+  def copy(self):
+    position = Position.__new__(Position)
+    position.config = self.config
+    position.current = self.current
+    position.mask = self.mask
+    position.heights = self.heights[:]
+    position.moves = self.moves
+    position.piece = self.piece
+    position.history = self.history[:]
+    position.hash = self.hash
+    position.mirror_hash = self.mirror_hash
+    return position
+
+  def can_play(self, column):
+    return not self.mask & self.config.top_masks[column]
+
+  def play(self, column):
+    config = self.config
+    row = self.heights[column]
+    index = column * config.column_height + row
+    self.current ^= self.mask
+    self.mask |= 1 << index
+    self.hash ^= config.zobrist_keys[self.piece][index] ^ config.zobrist_side
+    self.mirror_hash ^= config.mirror_keys[self.piece][index] ^ config.zobrist_side
+    self.heights[column] = row + 1
+    self.moves += 1
+    self.piece = 3 - self.piece
+    self.history.append(column)
+    return row
+
+  def undo(self):
+    config = self.config
+    column = self.history.pop()
+    row = self.heights[column] - 1
+    index = column * config.column_height + row
+    self.mask ^= 1 << index
+    self.current ^= self.mask
+    self.heights[column] = row
+    self.moves -= 1
+    self.piece = 3 - self.piece
+    self.hash ^= config.zobrist_keys[self.piece][index] ^ config.zobrist_side
+    self.mirror_hash ^= config.mirror_keys[self.piece][index] ^ config.zobrist_side
+    return column
+
+  def canonical_hash(self):
+    # The smaller of the hash and the mirror hash, so a position and its
+    # mirror share one key. Returns (key, mirrored) where mirrored says the
+    # key is the mirror's, so columns stored under it must be mirrored.
+    if self.mirror_hash < self.hash:
+      return self.mirror_hash, True
+    return self.hash, False
+
+  def bits_of(self, piece):
+    if piece == self.piece:
+      return self.current
+    return self.current ^ self.mask
+
+  def piece_at(self, row, column):
+    bit = self.config.cell_bit(row, column)
+    if not self.mask & bit:
+      return EMPTY
+    if self.current & bit:
+      return self.piece
+    return 3 - self.piece
+
+  def to_array(self):
+    cell_shifts = self.config.cell_shifts
+    first = (np.uint64(self.bits_of(FIRST_PIECE)) >> cell_shifts) & np.uint64(1)
+    second = (np.uint64(self.bits_of(SECOND_PIECE)) >> cell_shifts) & np.uint64(1)
+    return (first + 2 * second).astype(np.int8)
+
+
+def create_board(piece=FIRST_PIECE, config=DEFAULT_CONFIG):
+  return Position(piece, config)
+
+
+def board_from_moves(moves, piece=FIRST_PIECE, config=DEFAULT_CONFIG):
+  # moves is a string of column digits, e.g. "3324"
+  board = Position(piece, config)
+  for move in moves:
+    board.play(int(move))
+  return board
+
+
+def board_from_grid(grid, piece=None, config=DEFAULT_CONFIG):
+  # grid is indexed [row][column] with row 0 at the bottom, as to_array()
+  # returns it. piece is the side to move; it may be left out unless both
+  # sides have the same number of stones.
+  board = Position(FIRST_PIECE, config)
+  if len(grid) != config.row_count or any(len(row) != config.column_count for row in grid):
+    raise ValueError('grid must have {} rows of {} cells'.format(config.row_count, config.column_count))
+  counts = {FIRST_PIECE: 0, SECOND_PIECE: 0}
+  stones = {FIRST_PIECE: 0, SECOND_PIECE: 0}
+  for c in range(config.column_count):
+    for r in range(config.row_count):
+      cell = grid[r][c]
+      if cell == EMPTY:
+        continue
+      if cell not in counts:
+        raise ValueError('unknown piece {} at row {} column {}'.format(cell, r, c))
+      if board.heights[c] != r:
+        raise ValueError('floating piece at row {} column {}'.format(r, c))
+      index = c * config.column_height + r
+      stones[cell] |= 1 << index
+      board.hash ^= config.zobrist_keys[cell][index]
+      board.mirror_hash ^= config.mirror_keys[cell][index]
+      board.heights[c] = r + 1
+      counts[cell] += 1
+
+  difference = counts[FIRST_PIECE] - counts[SECOND_PIECE]
+  if abs(difference) > 1:
+    raise ValueError('one side has {} more stones than the other'.format(abs(difference)))
+  if difference:
+    # The side with fewer stones is to move
+    expected = SECOND_PIECE if difference > 0 else FIRST_PIECE
+    if piece is not None and piece != expected:
+      raise ValueError('piece {} cannot be to move with these stone counts'.format(piece))
+    piece = expected
+  elif piece is None:
+    piece = FIRST_PIECE
+
+  board.piece = piece
+  board.current = stones[piece]
+  board.mask = stones[FIRST_PIECE] | stones[SECOND_PIECE]
+  board.moves = counts[FIRST_PIECE] + counts[SECOND_PIECE]
+  if piece == SECOND_PIECE:
+    board.hash ^= config.zobrist_side
+    board.mirror_hash ^= config.zobrist_side
+  return board
+
+
+def boards_to_array(boards, config=DEFAULT_CONFIG):
+  # Grids of many positions on one board size, shape (boards, rows, columns)
+  first = np.array([board.bits_of(FIRST_PIECE) for board in boards], dtype=np.uint64)
+  second = np.array([board.bits_of(SECOND_PIECE) for board in boards], dtype=np.uint64)
+  cell_shifts = config.cell_shifts
+  first = (first[:, None, None] >> cell_shifts) & np.uint64(1)
+  second = (second[:, None, None] >> cell_shifts) & np.uint64(1)
+  return (first + 2 * second).astype(np.int8)
+
+
+def child_arrays(boards, config=DEFAULT_CONFIG):
+  # Every legal move of every board as one (children, rows, columns) array.
+  # Returns the parent index and column of each child along with the grids,
+  # grouped by parent and in column order within each parent.
+  heights = np.array([board.heights for board in boards], dtype=np.intp).reshape(len(boards), config.column_count)
+  pieces = np.array([board.piece for board in boards], dtype=np.int8)
+  parents, columns = np.nonzero(heights < config.row_count)
+  grids = boards_to_array(boards, config)[parents]
+  grids[np.arange(len(parents)), heights[parents, columns], columns] = pieces[parents]
+  return parents, columns, grids
+
+
+def drop_piece(board, column):
+  return board.play(column)
+
+
+def is_valid_location(board, column):
+  return board.can_play(column)
+
+
+def get_next_open_row(board, column):
+  return board.heights[column]
+
+
+def get_valid_locations(board):
+  return [col for col in range(board.config.column_count) if board.can_play(col)]
+
+
+def print_board(board):
+  print(np.flip(board.to_array(), 0))
+
+
+def winning_move(board, piece):
+  return alignment(board.bits_of(piece), board.config)
+
+
+def last_move_wins(board, row, column):
+  # Only the windows through the dropped piece can have been completed by it
+  bits = board.bits_of(board.piece_at(row, column))
+  for window_mask in board.config.cell_window_masks[row][column]:
+    if bits & window_mask == window_mask:
+      return True
+  return False
+
+
+def last_move_winner(board):
+  if not board.history:
+    return EMPTY
+  column = board.history[-1]
+  if last_move_wins(board, board.heights[column] - 1, column):
+    return 3 - board.piece
+  return EMPTY
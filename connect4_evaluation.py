@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+import itertools
+
+import numpy as np
+
+from connect4_engine import (DEFAULT_CONFIG, EMPTY, FIRST_PIECE,
+  SECOND_PIECE, WINDOW_LENGTH, child_arrays)
+
+
+def build_window_table(evaluate_window, piece, window_length=WINDOW_LENGTH):
+  # A window's contents are encoded as a base 3 number, one digit per cell
+  powers = 3 ** np.arange(window_length, dtype=np.int64)
+  table = np.zeros(3 ** window_length, dtype=np.int64)
+  for window in itertools.product((EMPTY, FIRST_PIECE, SECOND_PIECE), repeat=window_length):
+    code = int(np.dot(window, powers))
+    table[code] = evaluate_window(list(window), piece)
+  return table
+
+
+def build_cell_windows(config):
+  # For every cell, the windows through it and the cell's base 3 place value
+  cell_windows = [[[] for c in range(config.column_count)] for r in range(config.row_count)]
+  for window_number, window in enumerate(config.windows):
+    for place, (r, c) in enumerate(window):
+      cell_windows[r][c].append((window_number, 3 ** place))
+  return cell_windows
+
+
+class PositionScorer:
+  # Table-driven replacement for looping evaluate_window over all windows.
+  # The window scores are computed once per piece from evaluate_window, so
+  # each script keeps its own weights. evaluate_window is called with
+  # windows of config.window_length cells.
+
+  def __init__(self, evaluate_window, center_weight, config=DEFAULT_CONFIG):
+    self.config = config
+    self.center_weight = center_weight
+    self.center_column = config.column_count // 2
+    self.window_powers = 3 ** np.arange(config.window_length, dtype=np.int64)
+    # Place value of every cell in every window, so the window codes of a
+    # flattened grid come from one float32 matrix product. Codes stay
+    # well below 2 ** 24, so float32 holds them exactly.
+    self.window_matrix = np.zeros((config.cells, len(config.windows)), dtype=np.float32)
+    for window_number, cells in enumerate(config.window_index):
+      self.window_matrix[cells, window_number] = self.window_powers
+    self.tables = {piece: build_window_table(evaluate_window, piece, config.window_length) for piece in (FIRST_PIECE, SECOND_PIECE)}
+    self.cell_windows = build_cell_windows(config)
+
+  def score_grid(self, grid, piece):
+    codes = (grid.reshape(-1).astype(np.float32) @ self.window_matrix).astype(np.intp)
+    center_count = np.count_nonzero(grid[:, self.center_column] == piece)
+    return int(self.tables[piece][codes].sum() + center_count * self.center_weight)
+
+  def score_position(self, board, piece):
+    return self.score_grid(board.to_array(), piece)
+
+  def score_grids(self, grids, piece):
+    # score_grid over a (k, rows, columns) array in one pass
+    codes = (grids.reshape(len(grids), -1).astype(np.float32) @ self.window_matrix).astype(np.intp)
+    center_counts = np.count_nonzero(grids[:, :, self.center_column] == piece, axis=1)
+    return self.tables[piece][codes].sum(axis=1) + center_counts * self.center_weight
+
+  def best_children(self, boards, piece):
+    # The best scoring move for piece from each board, leftmost on ties,
+    # scoring every legal move of every board at once. Boards without a
+    # legal move get column -1.
+    parents, columns, grids = child_arrays(boards, self.config)
+    if not len(parents):
+      return best_child_scores(len(boards), parents, columns, np.zeros(0, dtype=np.int64))
+    return best_child_scores(len(boards), parents, columns, self.score_grids(grids, piece))
+
+
+def best_child_scores(count, parents, columns, scores):
+  # Reduces child scores grouped by parent, as from child_arrays, to the
+  # best column and score of each of count parents
+  best_columns = np.full(count, -1, dtype=np.intp)
+  best_scores = np.zeros(count, dtype=np.int64)
+  if not len(parents):
+    return best_columns, best_scores
+
+  starts = np.flatnonzero(np.r_[True, parents[1:] != parents[:-1]])
+  groups = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(parents)]))
+  best = np.maximum.reduceat(scores, starts)
+  # Children are in column order, so the first best child is the leftmost
+  candidates = np.flatnonzero(scores == best[groups])
+  first = candidates[np.r_[True, groups[candidates[1:]] != groups[candidates[:-1]]]]
+  best_columns[parents[first]] = columns[first]
+  best_scores[parents[first]] = scores[first]
+  return best_columns, best_scores
+
+
+class IncrementalEvaluator:
+  # Keeps the window codes and a running score for both pieces, so a drop
+  # or an undo only touches the windows through one cell and reading the
+  # score is free. Must see every drop and undo made on the board it follows.
+
+  def __init__(self, scorer, board=None):
+    window_count = len(scorer.config.windows)
+    self.center_weight = scorer.center_weight
+    self.center_column = scorer.center_column
+    self.cell_windows = scorer.cell_windows
+    self.first_table = scorer.tables[FIRST_PIECE].tolist()
+    self.second_table = scorer.tables[SECOND_PIECE].tolist()
+    self.codes = [0] * window_count
+    self.first_score = self.first_table[0] * window_count
+    self.second_score = self.second_table[0] * window_count
+    if board is not None:
+      for c in range(scorer.config.column_count):
+        for r in range(board.heights[c]):
+          self.drop(r, c, board.piece_at(r, c))
+
+  def drop(self, row, column, piece):
+    self.update(row, column, piece, piece)
+
+  def undo(self, row, column, piece):
+    self.update(row, column, piece, -piece)
+
+  def update(self, row, column, piece, digit):
+    codes = self.codes
+    first_table = self.first_table
+    second_table = self.second_table
+    first_delta = 0
+    second_delta = 0
+    for window_number, place in self.cell_windows[row][column]:
+      old = codes[window_number]
+      new = old + digit * place
+      codes[window_number] = new
+      first_delta += first_table[new] - first_table[old]
+      second_delta += second_table[new] - second_table[old]
+    if column == self.center_column:
+      if piece == FIRST_PIECE:
+        first_delta += self.center_weight if digit > 0 else -self.center_weight
+      else:
+        second_delta += self.center_weight if digit > 0 else -self.center_weight
+    self.first_score += first_delta
+    self.second_score += second_delta
+
+  def score(self, piece):
+    if piece == FIRST_PIECE:
+      return self.first_score
+    return self.second_score
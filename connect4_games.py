@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+
+# Bulk analysis of the game records in connect4_records' format.
+# python connect4_games.py analyze connect4_games.txt --output analysis.jsonl
+# python connect4_games.py blunders analysis.jsonl
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+from connect4_engine import board_config, create_board, drop_piece, last_move_winner
+from connect4_records import (COLUMN_DIGITS, GAMES_PATH, board_from_record,
+  format_game, load_games)
+from connect4_server import analyze_position
+from connect4_solver import Solver
+from connect4_transposition import TranspositionTable
+
+
+ANALYSIS_DEPTH = 6
+CHUNK_SIZE = 16
+PROGRESS_INTERVAL = 5.0
+WORKER_TABLE_MEMORY = 4 * 1024 * 1024
+# Score lost against the best move for a move to count as a blunder
+BLUNDER_LOSS = 500
+
+_worker_table = None
+_worker_solver = None
+
+
+def analyze_game(job):
+  # Scores every move of one game with the best move the side to move had.
+  # Annotations are (played score, best column, best score), scores for
+  # the mover; a game that cannot be replayed is returned with its error.
+  global _worker_table, _worker_solver
+  index, first, moves, depth, size = job
+  if _worker_table is None:
+    _worker_table = TranspositionTable(WORKER_TABLE_MEMORY)
+    _worker_solver = Solver()
+  config = board_config(*size)
+  record = {'game': index, 'record': format_game(first, moves)}
+  try:
+    board_from_record(first, moves, config)
+  except ValueError as error:
+    record['error'] = str(error)
+    return record
+
+  # Entries left by other games would make the scores depend on which
+  # worker got the game, and a resumed run would not match
+  _worker_table.clear()
+  board = create_board(first, config)
+  annotations = []
+  for move in moves:
+    analysis = analyze_position(board, depth, _worker_table, _worker_solver)
+    annotations.append((analysis['column_scores'][move], analysis['column'], analysis['score']))
+    drop_piece(board, move)
+  record['annotations'] = annotations
+  record['winner'] = last_move_winner(board)
+  return record
+
+
+def completed_games(path):
+  # Game numbers already in an analysis file. A line cut short by a crash
+  # is dropped from the file so the analysis can be appended to; that
+  # includes a last line missing only its newline, which would otherwise
+  # run into the next record.
+  done = set()
+  if not os.path.exists(path):
+    return done
+  with open(path, 'rb+') as analysis_file:
+    good = 0
+    for line in analysis_file:
+      if not line.endswith(b'\n'):
+        break
+      try:
+        done.add(json.loads(line)['game'])
+      except (ValueError, KeyError):
+        break
+      good += len(line)
+    analysis_file.truncate(good)
+  return done
+
+
+def analyze_games(args):
+  firsts, moves, lengths, config = load_games(args.games)
+  size = (config.column_count, config.row_count, config.window_length)
+  done = completed_games(args.output)
+  pending = [index for index in range(len(firsts)) if index not in done]
+  print('{} games, {} already analyzed'.format(len(firsts), len(firsts) - len(pending)), file=sys.stderr)
+  jobs = ((index, int(firsts[index]), moves[index, :lengths[index]].tolist(), args.depth, size) for index in pending)
+
+  start = time.perf_counter()
+  last_report = start
+  analyzed = 0
+  with open(args.output, 'a') as output, multiprocessing.Pool(args.workers) as pool:
+    for record in pool.imap_unordered(analyze_game, jobs, chunksize=args.chunk_size):
+      output.write(json.dumps(record, separators=(',', ':')) + '\n')
+      analyzed += 1
+      now = time.perf_counter()
+      if now - last_report >= args.progress:
+        # Everything reported as done is on disk, so a restart resumes from here
+        output.flush()
+        rate = analyzed / (now - start)
+        remaining = (len(pending) - analyzed) / rate
+        print('{}/{} games, {:.1f} games/s, {:.0f}s left'.format(analyzed, len(pending), rate, remaining), file=sys.stderr)
+        last_report = now
+  print('analyzed {} games in {:.1f}s'.format(analyzed, time.perf_counter() - start), file=sys.stderr)
+
+
+def blunders(args):
+  # Moves that lost at least --loss against the best move, worst first
+  found = []
+  with open(args.analysis) as analysis_file:
+    for line in analysis_file:
+      record = json.loads(line)
+      for ply, (played, best_column, best) in enumerate(record.get('annotations', [])):
+        if best - played >= args.loss:
+          found.append((best - played, record['game'], ply, record['record'], best_column))
+  found.sort(key=lambda blunder: (-blunder[0], blunder[1], blunder[2]))
+  for loss, game, ply, record, best_column in found[:args.limit]:
+    first, moves = record.split(' ')
+    print('game {} ply {}: played {} after "{} {}", best {}, lost {}'.format(game, ply, moves[ply], first, moves[:ply], COLUMN_DIGITS[best_column], loss))
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Analyze game records.')
+  subparsers = parser.add_subparsers(dest='command', required=True)
+  analyze_parser = subparsers.add_parser('analyze')
+  analyze_parser.add_argument('games', nargs='?', default=GAMES_PATH)
+  analyze_parser.add_argument('--output', required=True, help='JSON lines file, appended to and resumed from')
+  analyze_parser.add_argument('--depth', type=int, default=ANALYSIS_DEPTH)
+  analyze_parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+  analyze_parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='games handed to a worker at a time')
+  analyze_parser.add_argument('--progress', type=float, default=PROGRESS_INTERVAL, help='seconds between reports')
+  blunders_parser = subparsers.add_parser('blunders')
+  blunders_parser.add_argument('analysis')
+  blunders_parser.add_argument('--loss', type=int, default=BLUNDER_LOSS)
+  blunders_parser.add_argument('--limit', type=int, default=20)
+  args = parser.parse_args()
+
+  if args.command == 'analyze':
+    try:
+      analyze_games(args)
+    except (OSError, ValueError) as error:
+      parser.error(str(error))
+  else:
+    blunders(args)
+
+
+if __name__ == '__main__':
+  main()
@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+
+# A small learned evaluator, a one hidden layer perceptron in NumPy
+# trained on the self-play records of connect4_dataset.
+# python connect4_learned.py --data data --output model.npz
+#
+# The inputs are the stones of the side to move and of the opponent and
+# the output is the expected result for the side to move. Scores are that
+# result times EVAL_SCALE, so they stay inside the minimax win scores.
+
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from connect4_dataset import read_shard, record_planes, shard_paths
+from connect4_engine import (FIRST_PIECE, SECOND_PIECE, board_config,
+  boards_to_array, child_arrays)
+from connect4_evaluation import best_child_scores
+
+
+HIDDEN = 32
+EVAL_SCALE = 1000
+EPOCHS = 10
+BATCH_SIZE = 256
+LEARNING_RATE = 0.001
+VALIDATION_FRACTION = 0.05
+ADAM_BETAS = (0.9, 0.999)
+ADAM_EPSILON = 1e-8
+
+
+class ValueModel:
+  # weights1 is (2 * cells, hidden): rows for the side to move's stones
+  # followed by rows for the opponent's, cells numbered row * columns +
+  # column from the bottom left.
+
+  def __init__(self, weights1, bias1, weights2, bias2, config):
+    self.config = config
+    self.weights1 = np.asarray(weights1, dtype=np.float32)
+    self.bias1 = np.asarray(bias1, dtype=np.float32)
+    self.weights2 = np.asarray(weights2, dtype=np.float32)
+    self.bias2 = np.float32(bias2)
+
+  @classmethod
+  def random(cls, config, hidden=HIDDEN, seed=0):
+    rng = np.random.default_rng(seed)
+    inputs = 2 * config.cells
+    weights1 = rng.normal(0, np.sqrt(2 / inputs), (inputs, hidden))
+    weights2 = rng.normal(0, np.sqrt(1 / hidden), hidden)
+    return cls(weights1, np.zeros(hidden), weights2, 0.0, config)
+
+  def save(self, path):
+    size = (self.config.column_count, self.config.row_count, self.config.window_length)
+    np.savez(path, weights1=self.weights1, bias1=self.bias1, weights2=self.weights2, bias2=self.bias2, size=size)
+
+  def predict(self, inputs):
+    # Expected results in [-1, 1] for a batch of (n, 2 * cells) inputs
+    hidden = np.maximum(inputs @ self.weights1 + self.bias1, 0)
+    return np.tanh(hidden @ self.weights2 + self.bias2)
+
+  def predict_planes(self, planes):
+    return self.predict(planes.reshape(len(planes), -1).astype(np.float32))
+
+  def predict_grids(self, grids, piece):
+    # Expected results for piece, with piece to move, over (n, rows, columns)
+    other = SECOND_PIECE if piece == FIRST_PIECE else FIRST_PIECE
+    grids = grids.reshape(len(grids), -1)
+    inputs = np.concatenate((grids == piece, grids == other), axis=1).astype(np.float32)
+    return self.predict(inputs)
+
+  def scores(self, results):
+    return np.rint(results * EVAL_SCALE).astype(np.int64)
+
+  def score_boards(self, boards, piece):
+    # Scores for piece, each board judged from its side to move
+    grids = boards_to_array(boards, self.config)
+    to_move = np.array([board.piece for board in boards])
+    scores = self.scores(self.predict_grids(grids, piece))
+    other = SECOND_PIECE if piece == FIRST_PIECE else FIRST_PIECE
+    if np.any(to_move == other):
+      scores[to_move == other] = -self.scores(self.predict_grids(grids[to_move == other], other))
+    return scores
+
+  def score_position(self, board, piece):
+    return int(self.score_boards([board], piece)[0])
+
+  def best_children(self, boards, piece):
+    # As PositionScorer.best_children; the children all have the opponent to move
+    parents, columns, grids = child_arrays(boards, self.config)
+    other = SECOND_PIECE if piece == FIRST_PIECE else FIRST_PIECE
+    scores = -self.scores(self.predict_grids(grids, other)) if len(parents) else np.zeros(0, dtype=np.int64)
+    return best_child_scores(len(boards), parents, columns, scores)
+
+
+def load_model(path):
+  with np.load(path) as data:
+    return ValueModel(data['weights1'], data['bias1'], data['weights2'], data['bias2'], board_config(*data['size'].tolist()))
+
+
+class LearnedEvaluator:
+  # Drop-in for IncrementalEvaluator in minimax. Keeps the hidden layer
+  # input from both sides' point of view, so a drop or an undo adds or
+  # subtracts two weight rows and only the output layer runs per leaf.
+  # Must see every drop and undo made on the board it follows.
+
+  def __init__(self, model, board):
+    self.model = model
+    self.board = board
+    cells = model.config.cells
+    column_count = model.config.column_count
+    self.own_rows = [[model.weights1[r * column_count + c] for c in range(column_count)] for r in range(model.config.row_count)]
+    self.other_rows = [[model.weights1[cells + r * column_count + c] for c in range(column_count)] for r in range(model.config.row_count)]
+    self.accumulators = {FIRST_PIECE: model.bias1.copy(), SECOND_PIECE: model.bias1.copy()}
+    for c in range(column_count):
+      for r in range(board.heights[c]):
+        self.drop(r, c, board.piece_at(r, c))
+
+  def drop(self, row, column, piece):
+    other = SECOND_PIECE if piece == FIRST_PIECE else FIRST_PIECE
+    self.accumulators[piece] += self.own_rows[row][column]
+    self.accumulators[other] += self.other_rows[row][column]
+
+  def undo(self, row, column, piece):
+    other = SECOND_PIECE if piece == FIRST_PIECE else FIRST_PIECE
+    self.accumulators[piece] -= self.own_rows[row][column]
+    self.accumulators[other] -= self.other_rows[row][column]
+
+  def score(self, piece):
+    to_move = self.board.piece
+    hidden = np.maximum(self.accumulators[to_move], 0)
+    score = int(round(float(np.tanh(hidden @ self.model.weights2 + self.model.bias2)) * EVAL_SCALE))
+    return score if to_move == piece else -score
+
+
+def load_training_data(directory):
+  # Inputs and targets of every record, each position also mirrored, and
+  # the board config the records were played on
+  shards = []
+  sizes = set()
+  for path in shard_paths(directory):
+    records, size = read_shard(path)
+    shards.append(records)
+    sizes.add(size)
+  if not shards:
+    raise ValueError('no dataset shards in {}'.format(directory))
+  if len(sizes) > 1:
+    raise ValueError('{} mixes board sizes {}'.format(directory, sorted(sizes)))
+  config = board_config(*sizes.pop())
+  records = np.concatenate(shards)
+  planes = record_planes(records, config)
+  planes = np.concatenate((planes, planes[:, :, :, ::-1]))
+  inputs = planes.reshape(len(planes), -1).astype(np.float32)
+  targets = np.tile(records['result'].astype(np.float32), 2)
+  return inputs, targets, config
+
+
+def mean_squared_error(model, inputs, targets):
+  return float(np.mean((model.predict(inputs) - targets) ** 2))
+
+
+def train(model, inputs, targets, epochs=EPOCHS, batch_size=BATCH_SIZE, learning_rate=LEARNING_RATE, seed=0, validation=None, log=None):
+  # Minibatch Adam on the squared error of the predicted results
+  rng = np.random.default_rng(seed)
+  parameters = [model.weights1, model.bias1, model.weights2, np.array([model.bias2], dtype=np.float32)]
+  moments = [np.zeros_like(parameter) for parameter in parameters]
+  squares = [np.zeros_like(parameter) for parameter in parameters]
+  beta1, beta2 = ADAM_BETAS
+  step = 0
+
+  for epoch in range(epochs):
+    order = rng.permutation(len(inputs))
+    for start in range(0, len(order), batch_size):
+      batch = order[start:start + batch_size]
+      x = inputs[batch]
+      pre_hidden = x @ parameters[0] + parameters[1]
+      hidden = np.maximum(pre_hidden, 0)
+      output = np.tanh(hidden @ parameters[2] + parameters[3][0])
+
+      error = 2 * (output - targets[batch]) * (1 - output ** 2) / len(batch)
+      hidden_error = np.outer(error, parameters[2]) * (pre_hidden > 0)
+      gradients = [x.T @ hidden_error, hidden_error.sum(axis=0), hidden.T @ error, np.array([error.sum()], dtype=np.float32)]
+
+      step += 1
+      for parameter, gradient, moment, square in zip(parameters, gradients, moments, squares):
+        moment *= beta1
+        moment += (1 - beta1) * gradient
+        square *= beta2
+        square += (1 - beta2) * gradient ** 2
+        corrected = moment / (1 - beta1 ** step)
+        parameter -= learning_rate * corrected / (np.sqrt(square / (1 - beta2 ** step)) + ADAM_EPSILON)
+
+    model.bias2 = np.float32(parameters[3][0])
+    if log is not None:
+      message = 'epoch {} train mse {:.4f}'.format(epoch + 1, mean_squared_error(model, inputs[:100000], targets[:100000]))
+      if validation is not None:
+        message += ' validation mse {:.4f}'.format(mean_squared_error(model, *validation))
+      log(message)
+  return model
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Train the learned evaluator on self-play data.')
+  parser.add_argument('--data', required=True, help='directory of dataset shards')
+  parser.add_argument('--output', required=True, help='model file, .npz')
+  parser.add_argument('--hidden', type=int, default=HIDDEN)
+  parser.add_argument('--epochs', type=int, default=EPOCHS)
+  parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+  parser.add_argument('--learning-rate', type=float, default=LEARNING_RATE)
+  parser.add_argument('--seed', type=int, default=0)
+  args = parser.parse_args()
+
+  start = time.perf_counter()
+  try:
+    inputs, targets, config = load_training_data(args.data)
+  except ValueError as error:
+    parser.error(str(error))
+  print('{} training positions'.format(len(inputs)), file=sys.stderr)
+
+  # Mirrored positions are held out along with their originals
+  rng = np.random.default_rng(args.seed)
+  count = len(inputs) // 2
+  held_out = rng.permutation(count)[:int(count * VALIDATION_FRACTION)]
+  held_out = np.concatenate((held_out, held_out + count))
+  kept = np.setdiff1d(np.arange(len(inputs)), held_out)
+
+  model = ValueModel.random(config, args.hidden, args.seed)
+  train(model, inputs[kept], targets[kept], args.epochs, args.batch_size, args.learning_rate, args.seed,
+    (inputs[held_out], targets[held_out]), lambda message: print(message, file=sys.stderr))
+  model.save(args.output)
+  print('saved {} in {:.1f}s'.format(args.output, time.perf_counter() - start), file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
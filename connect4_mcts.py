@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+
+# Monte Carlo tree search with UCT selection. Each step picks a batch of
+# leaves and plays random games from all of them at once, as numpy
+# bitboard vectors, so a ply of every playout is a handful of array ops.
+
+import math
+import time
+
+import numpy as np
+
+from connect4_engine import alignments, get_valid_locations, last_move_wins
+
+
+EXPLORATION = 1.4
+# Leaves per batch and random games from each leaf
+BATCH_LEAVES = 32
+LEAF_PLAYOUTS = 8
+
+
+def random_playouts(current, mask, config, rng):
+  # Plays random legal moves to the end from every (current, mask) pair.
+  # Returns each game's result for the side to move at the start: 1 for a
+  # win, -1 for a loss and 0 for a draw.
+  top_masks = np.array(config.top_masks, dtype=np.uint64)
+  bottoms = np.array([1 << (c * config.column_height) for c in range(config.column_count)], dtype=np.uint64)
+  column_masks = np.array(config.column_masks, dtype=np.uint64)
+  board_mask = np.uint64(config.board_mask)
+
+  current = np.array(current, dtype=np.uint64)
+  mask = np.array(mask, dtype=np.uint64)
+  results = np.zeros(len(current), dtype=np.int8)
+  # Games on full boards are draws and take no part
+  games = np.flatnonzero(mask != board_mask)
+  current, mask = current[games], mask[games]
+  result = 1
+
+  while len(games):
+    # A random float per column, zeroed for full columns, picks a legal move
+    legal = (mask[:, None] & top_masks) == 0
+    columns = np.argmax(rng.random(legal.shape, dtype=np.float32) * legal, axis=1)
+    move = (mask + bottoms[columns]) & column_masks[columns]
+    won = alignments(current | move, config)
+    results[games[won]] = result
+
+    current, mask = current ^ mask, mask | move
+    playing = ~won & (mask != board_mask)
+    games, current, mask = games[playing], current[playing], mask[playing]
+    result = -result
+  return results
+
+
+class Node:
+  # total is the sum of results for the player who moved into the node
+
+  __slots__ = ('column', 'parent', 'children', 'untried', 'visits', 'total', 'terminal')
+
+  def __init__(self, column, parent, untried, terminal=None):
+    self.column = column
+    self.parent = parent
+    self.children = []
+    self.untried = untried
+    self.visits = 0
+    self.total = 0.0
+    # The result for the player who moved into the node once the game is over
+    self.terminal = terminal
+
+  def select(self, exploration):
+    log_visits = math.log(self.visits)
+    best = None
+    best_score = -math.inf
+    for child in self.children:
+      score = child.total / child.visits + exploration * math.sqrt(log_visits / child.visits)
+      if score > best_score:
+        best = child
+        best_score = score
+    return best
+
+
+def expand(node, board, rng):
+  # Plays an untried move on board and returns its new child
+  column = node.untried.pop(rng.integers(len(node.untried)))
+  row = board.play(column)
+  terminal = None
+  untried = []
+  if last_move_wins(board, row, column):
+    terminal = 1
+  elif board.moves == board.config.cells:
+    terminal = 0
+  else:
+    untried = get_valid_locations(board)
+  child = Node(column, node, untried, terminal)
+  node.children.append(child)
+  return child
+
+
+def mcts(board, maximizingPlayer, seconds=None, playouts=None, budget=None, batch_leaves=BATCH_LEAVES, leaf_playouts=LEAF_PLAYOUTS, exploration=EXPLORATION, seed=None):
+  # Returns the most visited column, its value for Black in [-1, 1], the
+  # value of every column as minimax formats them, and the playout count,
+  # in the shape of iterative_deepening's result. Stops after seconds or
+  # playouts, or when a SearchBudget runs out or is stopped from another
+  # thread; at least one batch is always played. Leaves that end the game
+  # count as playouts, so a solved tree still uses up the budget.
+  rng = np.random.default_rng(seed)
+  deadline = None if seconds is None else time.perf_counter() + seconds
+  root = Node(None, None, get_valid_locations(board))
+  moves = board.moves
+  played = 0
+
+  while True:
+    leaves = []
+    for leaf in range(batch_leaves):
+      node = root
+      while node.terminal is None and not node.untried and node.children:
+        node = node.select(exploration)
+        board.play(node.column)
+      if node.terminal is None and node.untried:
+        node = expand(node, board, rng)
+      leaves.append((node, board.current, board.mask))
+      # A virtual loss steers the rest of the batch to other leaves
+      walk = node
+      while walk is not None:
+        walk.visits += leaf_playouts
+        walk.total -= leaf_playouts
+        walk = walk.parent
+      while board.moves > moves:
+        board.undo()
+
+    rollouts = [index for index, (node, current, mask) in enumerate(leaves) if node.terminal is None]
+    if rollouts:
+      current = np.repeat([leaves[index][1] for index in rollouts], leaf_playouts)
+      mask = np.repeat([leaves[index][2] for index in rollouts], leaf_playouts)
+      # Results are for the side to move in the leaf, not the player who moved into it
+      sums = random_playouts(current, mask, board.config, rng).reshape(len(rollouts), leaf_playouts).sum(axis=1, dtype=np.int64)
+      rollout_values = dict(zip(rollouts, (-sums).tolist()))
+
+    played += len(leaves) * leaf_playouts
+    for index, (node, current, mask) in enumerate(leaves):
+      value = node.terminal * leaf_playouts if node.terminal is not None else rollout_values[index]
+      while node is not None:
+        node.total += value + leaf_playouts
+        value = -value
+        node = node.parent
+
+    if budget is not None:
+      budget.nodes += len(leaves) * leaf_playouts
+      if budget.stopped:
+        break
+      if budget.max_nodes is not None and budget.nodes >= budget.max_nodes:
+        break
+      if budget.deadline is not None and time.perf_counter() >= budget.deadline:
+        break
+    if deadline is not None and time.perf_counter() >= deadline:
+      break
+    if playouts is not None and played >= playouts:
+      break
+    if deadline is None and playouts is None and budget is None:
+      break
+
+  best = max(root.children, key=lambda child: child.visits)
+  sign = 1 if maximizingPlayer else -1
+  column_score_list = [None] * board.config.column_count
+  for child in root.children:
+    column_score_list[child.column] = format(sign * child.total / child.visits, '.2f')
+  return best.column, sign * best.total / best.visits, column_score_list, played
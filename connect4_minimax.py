@@ -0,0 +1,313 @@
+#!/usr/bin/env python3
+
+import functools
+import math
+import time
+
+from connect4_engine import (DEFAULT_CONFIG, EMPTY, drop_piece,
+  get_valid_locations, last_move_winner)
+from connect4_evaluation import IncrementalEvaluator, PositionScorer
+from connect4_solver import Solver
+from connect4_transposition import EXACT, LOWER_BOUND, NO_MOVE, UPPER_BOUND
+
+
+RED_BOT_PIECE = 1
+BLACK_BOT_PIECE = 2
+
+CENTER_WEIGHT = 10
+WIN_SCORE = 10000
+
+# Positions with this many empty cells or fewer are solved exactly
+SOLVER_EMPTY_CELLS = 16
+
+# How many nodes to visit between clock reads
+TIME_CHECK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+  pass
+
+
+class SearchBudget:
+  # Wall-clock and node limits for one search; stop() may be called from
+  # another thread to end the search early
+
+  def __init__(self, seconds=None, nodes=None):
+    self.deadline = None if seconds is None else time.perf_counter() + seconds
+    self.max_nodes = nodes
+    self.nodes = 0
+    self.stopped = False
+
+  def stop(self):
+    self.stopped = True
+
+  def check(self):
+    self.nodes += 1
+    if self.stopped:
+      raise SearchTimeout()
+    if self.max_nodes is not None and self.nodes > self.max_nodes:
+      raise SearchTimeout()
+    if self.deadline is not None and self.nodes % TIME_CHECK_INTERVAL == 0:
+      if time.perf_counter() >= self.deadline:
+        raise SearchTimeout()
+
+
+def evaluate_window(window, piece):
+  opp_piece = RED_BOT_PIECE
+  if piece == RED_BOT_PIECE:
+    opp_piece = BLACK_BOT_PIECE
+
+  score = 0
+  length = len(window)
+
+  if window.count(piece) == length:
+    score += 50 
+  elif window.count(piece) == length - 1 and window.count(EMPTY) == 1:
+    score += 25
+  elif window.count(piece) == length - 2 and window.count(EMPTY) == 2:
+    score += 10
+
+  if window.count(opp_piece) == length - 1 and window.count(EMPTY) == 1:
+    score -= 1000
+  elif window.count(opp_piece) == length - 2 and window.count(EMPTY) == 2:
+    score -= 50
+
+  return score
+
+
+@functools.lru_cache(maxsize=None)
+def position_scorer(config):
+  return PositionScorer(evaluate_window, CENTER_WEIGHT, config)
+
+
+POSITION_SCORER = position_scorer(DEFAULT_CONFIG)
+
+
+def score_position(board, piece):
+  return position_scorer(board.config).score_position(board, piece)
+
+
+def store_search(table, board, depth, value, alpha, beta, best_column):
+  if table is None:
+    return
+  if value <= alpha:
+    bound = UPPER_BOUND
+  elif value >= beta:
+    bound = LOWER_BOUND
+  else:
+    bound = EXACT
+  # A position and its mirror share an entry, with the column as seen from the key's side
+  key, mirrored = board.canonical_hash()
+  if mirrored and best_column is not None:
+    best_column = board.config.mirror_column(best_column)
+  table.store(key, depth, value, bound, best_column)
+
+
+def minimax(board, depth, alpha, beta, maximizingPlayer, *, table=None, budget=None, first_column=None, ordering=None, evaluator=None, stats=None, root=True):
+  # Searches by playing and undoing moves on board itself. If budget raises
+  # SearchTimeout the board is left mid-search; see restore_board.
+  if budget is not None:
+    budget.check()
+  if stats is not None:
+    stats.nodes_by_depth[depth] = stats.nodes_by_depth.get(depth, 0) + 1
+  winner = last_move_winner(board)
+  cells = board.config.cells
+
+  if depth == 0 or winner != EMPTY or board.moves == cells:
+    if stats is not None:
+      if winner != EMPTY or board.moves == cells:
+        stats.terminal_hits += 1
+      else:
+        stats.leaf_evaluations += 1
+    if winner == BLACK_BOT_PIECE:
+      return (None, WIN_SCORE, None)
+    elif winner == RED_BOT_PIECE:
+      return (None, -WIN_SCORE, None)
+    elif board.moves == cells: # Game is over
+      return (None, 0, None)
+    elif evaluator is not None: #Depth is zero
+      return (None, evaluator.score(BLACK_BOT_PIECE), None)
+    else: #Depth is zero
+      return (None, score_position(board, BLACK_BOT_PIECE), None)
+
+  alpha_original = alpha
+  beta_original = beta
+  if table is not None:
+    key, mirrored = board.canonical_hash()
+    entry = table.lookup(key)
+    if entry is not None:
+      entry_depth, entry_value, entry_bound, entry_column = entry
+      if mirrored and entry_column != NO_MOVE:
+        entry_column = board.config.mirror_column(entry_column)
+      # The root always searches, as a cutoff there has no per-column scores
+      if entry_depth >= depth and not root:
+        if entry_bound == EXACT:
+          if stats is not None:
+            stats.table_cutoffs += 1
+          return entry_column, entry_value, None
+        elif entry_bound == LOWER_BOUND:
+          alpha = max(alpha, entry_value)
+        elif entry_bound == UPPER_BOUND:
+          beta = min(beta, entry_value)
+        if alpha >= beta:
+          if stats is not None:
+            stats.table_cutoffs += 1
+          return entry_column, entry_value, None
+      # Search the stored best move first
+      if first_column is None:
+        first_column = entry_column
+
+  valid_locations = get_valid_locations(board)
+  if ordering is not None:
+    ordering.order(board, valid_locations, first_column)
+  elif first_column in valid_locations:
+    valid_locations.remove(first_column)
+    valid_locations.insert(0, first_column)
+
+  piece = board.piece
+  column_score_list = None
+  best_column = valid_locations[0]
+
+  if maximizingPlayer:
+    value = -math.inf
+    if root:
+      column_score_list = [value] * board.config.column_count
+
+    for column in valid_locations:
+      row = drop_piece(board, column)
+      if evaluator is not None:
+        evaluator.drop(row, column, piece)
+      new_score = minimax(board, depth -1, alpha, beta, False, table=table, budget=budget, ordering=ordering, evaluator=evaluator, stats=stats, root=False)[1]
+      if evaluator is not None:
+        evaluator.undo(row, column, piece)
+      board.undo()
+      
+      if new_score > value:
+        value = new_score
+        best_column = column
+        if root:
+          column_score_list[column] = format(value, '.2f')
+      alpha = max(alpha, value)
+      if alpha >= beta:
+        if ordering is not None:
+          ordering.cutoff(board, column, depth)
+        if stats is not None:
+          stats.cutoffs += 1
+          if column == valid_locations[0]:
+            stats.first_move_cutoffs += 1
+        break
+
+  else:
+    value = math.inf
+    if root:
+      column_score_list = [value] * board.config.column_count
+
+    for column in valid_locations:
+      row = drop_piece(board, column)
+      if evaluator is not None:
+        evaluator.drop(row, column, piece)
+      new_score = minimax(board, depth -1, alpha, beta, True, table=table, budget=budget, ordering=ordering, evaluator=evaluator, stats=stats, root=False)[1]
+      if evaluator is not None:
+        evaluator.undo(row, column, piece)
+      board.undo()
+
+      if new_score < value:
+        value = new_score
+        best_column = column
+        if root:
+          column_score_list[column] = format(value, '.2f')
+      beta = min(beta, value)
+      if alpha >= beta:
+        if ordering is not None:
+          ordering.cutoff(board, column, depth)
+        if stats is not None:
+          stats.cutoffs += 1
+          if column == valid_locations[0]:
+            stats.first_move_cutoffs += 1
+        break
+
+  store_search(table, board, depth, value, alpha_original, beta_original, best_column)
+  if root and stats is not None:
+    stats.depth = depth
+    stats.finish()
+  return best_column, value, column_score_list
+
+
+def restore_board(board, moves, evaluator=None):
+  while board.moves > moves:
+    if evaluator is not None:
+      column = board.history[-1]
+      row = board.heights[column] - 1
+      evaluator.undo(row, column, board.piece_at(row, column))
+    board.undo()
+
+
+def endgame_value(score, piece):
+  # Maps a solver score for piece to the minimax scale, keeping faster wins higher
+  if score > 0:
+    value = WIN_SCORE + score
+  elif score < 0:
+    value = -WIN_SCORE + score
+  else:
+    value = 0
+  return value if piece == BLACK_BOT_PIECE else -value
+
+
+def solve_endgame(board, solver=None):
+  if solver is None:
+    solver = Solver()
+  scores = solver.solve_columns(board)
+  column_score_list = [None] * board.config.column_count
+  best_column = None
+  for column, score in enumerate(scores):
+    if score is None:
+      continue
+    column_score_list[column] = format(endgame_value(score, board.piece), '.2f')
+    if best_column is None or score > scores[best_column]:
+      best_column = column
+  return best_column, endgame_value(scores[best_column], board.piece), column_score_list
+
+
+def iterative_deepening(board, maximizingPlayer, seconds=None, nodes=None, max_depth=None, table=None, budget=None, ordering=None, solver_cells=SOLVER_EMPTY_CELLS, stats=None, evaluator=None, solver=None):
+  # Returns the result of the deepest completed iteration along with its depth.
+  # evaluator defaults to the heuristic and must follow board, as
+  # connect4_learned.LearnedEvaluator does. Pass a solver kept between
+  # calls to save building one, and its table, for every endgame move.
+  empty_cells = board.config.cells - board.moves
+  if empty_cells <= solver_cells and last_move_winner(board) == EMPTY:
+    column, value, column_score_list = solve_endgame(board, solver)
+    if stats is not None:
+      stats.depth = empty_cells
+      stats.finish()
+    return column, value, column_score_list, empty_cells
+
+  if evaluator is None:
+    evaluator = IncrementalEvaluator(position_scorer(board.config), board)
+  moves = board.moves
+  if budget is None:
+    budget = SearchBudget(seconds, nodes)
+  if max_depth is None:
+    max_depth = empty_cells
+  if table is not None:
+    table.new_search()
+
+  # Depth one is cheap and always finishes, so there is always a move to play
+  column, value, column_score_list = minimax(board, 1, -math.inf, math.inf, maximizingPlayer, table=table, ordering=ordering, evaluator=evaluator, stats=stats)
+  depth = 1
+
+  while depth < max_depth and abs(value) < WIN_SCORE:
+    try:
+      result = minimax(board, depth + 1, -math.inf, math.inf, maximizingPlayer, table=table, budget=budget, first_column=column, ordering=ordering, evaluator=evaluator, stats=stats)
+    except SearchTimeout:
+      # The aborted search left moves on the board and in the evaluator
+      restore_board(board, moves, evaluator)
+      break
+    column, value = result[0], result[1]
+    if result[2] is not None:
+      column_score_list = result[2]
+    depth += 1
+
+  if stats is not None:
+    stats.depth = depth
+    stats.finish()
+  return column, value, column_score_list, depth
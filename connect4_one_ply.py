@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+# The single position score bot: every column is scored by the position it
+# leads to, one ply deep. These run in the BotWorker of
+# connect4_bot_single_position_score.py, so they live in an importable
+# module rather than in the script.
+
+import random
+
+from connect4_engine import (EMPTY, FIRST_PIECE, SECOND_PIECE, drop_piece,
+  get_valid_locations, last_move_wins)
+from connect4_evaluation import PositionScorer
+from connect4_learned import load_model
+
+
+CENTER_WEIGHT = 6
+
+_models = {}
+
+
+def evaluate_window(window, piece):
+  opp_piece = FIRST_PIECE
+  if piece == FIRST_PIECE:
+    opp_piece = SECOND_PIECE
+
+  score = 0
+  if window.count(piece) == 4:
+    score += 100
+  elif window.count(piece) == 3 and window.count(EMPTY) == 1:
+    score += 10
+  elif window.count(piece) == 2 and window.count(EMPTY) == 2:
+    score += 5
+
+  if window.count(opp_piece) == 4:
+    score -= 100
+  elif window.count(opp_piece) == 3 and window.count(EMPTY) == 1:
+    score -= 10
+  elif window.count(opp_piece) == 2 and window.count(EMPTY) == 2:
+    score -= 5
+
+  return score
+
+
+POSITION_SCORER = PositionScorer(evaluate_window, CENTER_WEIGHT)
+
+
+def scorer(model_path=None):
+  # The window scorer, or a connect4_learned model loaded once per process
+  if model_path is None:
+    return POSITION_SCORER
+  if model_path not in _models:
+    _models[model_path] = load_model(model_path)
+  return _models[model_path]
+
+
+def score_position(board, piece, model_path=None):
+  return scorer(model_path).score_position(board, piece)
+
+
+def pick_best_moves(boards, piece, model_path=None):
+  # pick_best_move for many boards, scoring all their children in one batch
+  board_scorer = scorer(model_path)
+  best_columns, best_scores = board_scorer.best_children(boards, piece)
+  moves = []
+  for board, best_column, best_score in zip(boards, best_columns, best_scores):
+    if board_scorer is POSITION_SCORER and best_score <= -100:
+      # Nothing beat the starting score, so any column will do
+      moves.append((random.choice(get_valid_locations(board)), -100))
+    else:
+      moves.append((int(best_column), int(best_score)))
+  return moves
+
+
+def pick_best_move(board, piece, model_path=None):
+  return pick_best_moves([board], piece, model_path)[0]
+
+
+def ponder_replies(board, piece, model_path=None):
+  # Best reply to every move the player can make, worked out on the
+  # player's time so the reply is ready as soon as they click
+  replies = {}
+  for column in get_valid_locations(board):
+    temp_board = board.copy()
+    row = drop_piece(temp_board, column)
+    if not last_move_wins(temp_board, row, column) and get_valid_locations(temp_board):
+      replies[column] = temp_board
+  return dict(zip(replies, pick_best_moves(list(replies.values()), piece, model_path)))
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+
+KILLER_SLOTS = 2
+
+
+class MoveOrdering:
+  # Orders moves as: hinted move (transposition table or previous
+  # iteration), killer moves for this ply, history score, then center-out.
+  # Killers are indexed by ply, history by piece and column, and both are
+  # kept until new_game() so they carry over between turns.
+
+  def __init__(self, killers=True, history=True):
+    self.use_killers = killers
+    self.use_history = history
+    self.new_game()
+
+  def new_game(self):
+    self.killers = {}
+    self.history = [{} for piece in range(3)]
+
+  def order(self, board, valid_locations, first_column=None):
+    killers = self.killers.get(board.moves, ()) if self.use_killers else ()
+    history = self.history[board.piece]
+    center_rank = board.config.center_rank
+
+    def rank(column):
+      if column == first_column:
+        return (0, 0, 0)
+      if column in killers:
+        return (1, killers.index(column), 0)
+      return (2, -history.get(column, 0), center_rank[column])
+
+    valid_locations.sort(key=rank)
+    return valid_locations
+
+  def cutoff(self, board, column, depth):
+    if self.use_killers:
+      killers = self.killers.setdefault(board.moves, [])
+      if column not in killers:
+        killers.insert(0, column)
+        del killers[KILLER_SLOTS:]
+    if self.use_history:
+      history = self.history[board.piece]
+      history[column] = history.get(column, 0) + depth * depth
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+import concurrent.futures
+import itertools
+import math
+import os
+
+from connect4_engine import EMPTY, get_valid_locations, last_move_winner
+from connect4_evaluation import IncrementalEvaluator
+from connect4_minimax import minimax, position_scorer
+from connect4_ordering import MoveOrdering
+from connect4_transposition import TranspositionTable
+
+
+WORKER_TABLE_MEMORY = 4 * 1024 * 1024
+
+_search_ids = itertools.count()
+_worker_table = None
+_worker_search = None
+
+
+def search_root_child(search_id, board, column, depth, alpha, beta, maximizingPlayer):
+  global _worker_table, _worker_search
+  if _worker_table is None:
+    _worker_table = TranspositionTable(WORKER_TABLE_MEMORY)
+  if search_id != _worker_search:
+    # Entries from an earlier search may hold values from a different depth
+    _worker_table.clear()
+    _worker_search = search_id
+
+  board.play(column)
+  evaluator = IncrementalEvaluator(position_scorer(board.config), board)
+  return minimax(board, depth - 1, alpha, beta, not maximizingPlayer, table=_worker_table, ordering=MoveOrdering(), evaluator=evaluator, root=False)[1]
+
+
+def create_executor(workers=None):
+  return concurrent.futures.ProcessPoolExecutor(workers or os.cpu_count())
+
+
+def parallel_minimax(board, depth, maximizingPlayer, executor, workers=None):
+  # Searches each root column in its own task, center columns first. The
+  # center column is searched alone, so that even with a worker per column
+  # its siblings start with a bound; the rest are handed out as workers
+  # free up, each with the best bound found so far. Returns the same column and value as minimax(board, depth, -inf,
+  # inf, maximizingPlayer): ties go to the leftmost column, so columns left
+  # of the current best are searched one point below it to see exact ties.
+  valid_locations = get_valid_locations(board)
+  if depth <= 1 or not valid_locations or last_move_winner(board) != EMPTY:
+    return minimax(board, depth, -math.inf, math.inf, maximizingPlayer)
+
+  workers = workers or os.cpu_count()
+  search_id = (os.getpid(), next(_search_ids))
+  serial_index = {column: index for index, column in enumerate(valid_locations)}
+  pending = sorted(valid_locations, key=lambda column: board.config.center_rank[column])
+  running = {}
+  best_column = None
+  best_value = None
+  column_score_list = [-math.inf if maximizingPlayer else math.inf] * board.config.column_count
+
+  def window(column):
+    if best_value is None:
+      return -math.inf, math.inf
+    tie = 1 if serial_index[column] < serial_index[best_column] else 0
+    if maximizingPlayer:
+      return best_value - tie, math.inf
+    return -math.inf, best_value + tie
+
+  while pending or running:
+    while pending and len(running) < workers and (best_value is not None or not running):
+      column = pending.pop(0)
+      alpha, beta = window(column)
+      future = executor.submit(search_root_child, search_id, board, column, depth, alpha, beta, maximizingPlayer)
+      running[future] = (column, alpha, beta)
+
+    done, not_done = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+    for future in done:
+      column, alpha, beta = running.pop(future)
+      value = future.result()
+      # Values outside the window are only bounds and cannot beat the best
+      if not alpha < value < beta:
+        continue
+      column_score_list[column] = format(value, '.2f')
+      if best_value is None:
+        improved = True
+      elif value == best_value:
+        improved = serial_index[column] < serial_index[best_column]
+      elif maximizingPlayer:
+        improved = value > best_value
+      else:
+        improved = value < best_value
+      if improved:
+        best_column = column
+        best_value = value
+
+  return best_column, best_value, column_score_list
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+
+# Game records, one game per line as the first piece, a space and one
+# character per move: "1 3324" is piece 1 playing columns 3 and 2 with
+# piece 2 replying in 3 and 4. Columns past 9 use letters. A "#size"
+# line gives the board size when it is not 7x6, connect 4. Kept apart
+# from connect4_games so the pygame scripts can save their games without
+# loading the search.
+
+import os
+
+import numpy as np
+
+from connect4_engine import (COLUMN_COUNT, EMPTY, FIRST_PIECE, ROW_COUNT,
+  SECOND_PIECE, WINDOW_LENGTH, board_config, create_board, drop_piece,
+  last_move_winner)
+
+
+GAMES_PATH = 'connect4_games.txt'
+COLUMN_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+SIZE_PREFIX = '#size'
+# Lines parsed per numpy pass, which bounds the loader's scratch memory
+LOAD_CHUNK = 1 << 16
+
+
+def format_game(first, columns):
+  return '{} {}'.format(first, ''.join(COLUMN_DIGITS[column] for column in columns))
+
+
+def game_record(board):
+  first = board.piece if board.moves % 2 == 0 else 3 - board.piece
+  return format_game(first, board.history)
+
+
+def size_line(config):
+  return '{} {} {} {}'.format(SIZE_PREFIX, config.column_count, config.row_count, config.window_length)
+
+
+def append_game(board, path=GAMES_PATH):
+  # Appends one record, starting the file with its size line if needed
+  new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+  with open(path, 'a') as games_file:
+    if new_file and (board.config.column_count, board.config.row_count, board.config.window_length) != (COLUMN_COUNT, ROW_COUNT, WINDOW_LENGTH):
+      games_file.write(size_line(board.config) + '\n')
+    games_file.write(game_record(board) + '\n')
+
+
+def board_from_record(first, moves, config):
+  # Replays a record, raising ValueError on an illegal move or on moves
+  # after the game was won
+  board = create_board(first, config)
+  for move in moves:
+    if last_move_winner(board) != EMPTY:
+      raise ValueError('moves continue after the game was won')
+    if not 0 <= move < config.column_count or not board.can_play(move):
+      raise ValueError('illegal move {}'.format(COLUMN_DIGITS[move] if 0 <= move < len(COLUMN_DIGITS) else move))
+    drop_piece(board, move)
+  return board
+
+
+def load_games(path):
+  # Returns (firsts, moves, lengths, config): the first piece of every
+  # game, its moves as an (games, cells) int8 array padded with -1 and the
+  # number of moves, parsed with numpy rather than line by line
+  data = np.fromfile(path, dtype=np.uint8)
+  if len(data) and data[-1] != ord('\n'):
+    data = np.append(data, np.uint8(ord('\n')))
+  ends = np.flatnonzero(data == ord('\n'))
+  starts = np.r_[0, ends[:-1] + 1][:len(ends)]
+
+  config = board_config()
+  comments = np.flatnonzero((ends > starts) & (data[starts] == ord('#')))
+  for line in comments:
+    text = data[starts[line]:ends[line]].tobytes().decode('ascii', 'replace').split()
+    if text[0] == SIZE_PREFIX:
+      try:
+        config = board_config(*[int(value) for value in text[1:4]])
+      except (TypeError, ValueError) as error:
+        raise ValueError('line {}: bad size line: {}'.format(line + 1, error))
+
+  lines = np.flatnonzero((ends > starts) & (data[starts] != ord('#')))
+  starts, ends = starts[lines], ends[lines]
+  # Windows line endings leave a carriage return before the newline
+  ends = ends - (data[ends - 1] == ord('\r'))
+
+  digits = np.full(256, -1, dtype=np.int8)
+  for column in range(config.column_count):
+    digits[ord(COLUMN_DIGITS[column])] = column
+
+  firsts = (data[starts] - ord('0')).astype(np.int8)
+  lengths = (ends - starts - 2).clip(0).astype(np.intp)
+  bad = (firsts != FIRST_PIECE) & (firsts != SECOND_PIECE)
+  bad |= (ends - starts > 1) & (data[np.minimum(starts + 1, len(data) - 1)] != ord(' '))
+  bad |= lengths > config.cells
+  if bad.any():
+    line = lines[np.argmax(bad)]
+    raise ValueError('line {}: not a game record'.format(line + 1))
+
+  moves = np.full((len(starts), config.cells), -1, dtype=np.int8)
+  places = np.arange(config.cells)
+  for chunk in range(0, len(starts), LOAD_CHUNK):
+    chunk_lengths = lengths[chunk:chunk + LOAD_CHUNK]
+    played = places < chunk_lengths[:, None]
+    indexes = (starts[chunk:chunk + LOAD_CHUNK, None] + 2 + places)[played]
+    chunk_moves = moves[chunk:chunk + LOAD_CHUNK]
+    chunk_moves[played] = digits[data[indexes]]
+    unknown = ((chunk_moves < 0) & played).any(axis=1)
+    if unknown.any():
+      line = lines[chunk + np.argmax(unknown)]
+      raise ValueError('line {}: unknown column'.format(line + 1))
+  return firsts, moves, lengths, config
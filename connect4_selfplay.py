@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+# Headless bot-v-bot self-play across a process pool.
+# python connect4_selfplay.py --games 100 --depth 5 --output games.jsonl
+
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+from connect4_engine import (COLUMN_COUNT, EMPTY, ROW_COUNT, WINDOW_LENGTH,
+  board_config, create_board, drop_piece, get_valid_locations, last_move_wins)
+from connect4_minimax import BLACK_BOT_PIECE, iterative_deepening
+from connect4_ordering import MoveOrdering
+from connect4_solver import Solver
+from connect4_stats import SearchStats
+from connect4_transposition import TranspositionTable
+
+
+GAME_DEPTH = 5
+OPENING_PLIES = 2
+TABLE_MEMORY = 4 * 1024 * 1024
+
+_worker_solver = None
+
+
+def play_game(game, seed, depth, move_time, table_memory, opening_plies, size=(COLUMN_COUNT, ROW_COUNT, WINDOW_LENGTH)):
+  global _worker_solver
+  rng = random.Random(seed * 1000003 + game)
+  board = create_board(rng.randint(1, 2), board_config(*size))
+  # One per worker, as solved scores do not depend on what it solved before
+  if _worker_solver is None:
+    _worker_solver = Solver()
+  first_piece = board.piece
+  table = TranspositionTable(table_memory)
+  ordering = MoveOrdering()
+  moves = []
+  move_times = []
+  move_nodes = []
+  winner = EMPTY
+
+  while board.moves < board.config.cells:
+    start = time.perf_counter()
+    stats = SearchStats()
+    # The search is deterministic, so random opening moves keep games apart
+    if board.moves < opening_plies:
+      column = rng.choice(get_valid_locations(board))
+    elif move_time is None:
+      column = iterative_deepening(board, board.piece == BLACK_BOT_PIECE, max_depth=depth, table=table, ordering=ordering, stats=stats, solver=_worker_solver)[0]
+    else:
+      column = iterative_deepening(board, board.piece == BLACK_BOT_PIECE, move_time, table=table, ordering=ordering, stats=stats, solver=_worker_solver)[0]
+    move_times.append(round(time.perf_counter() - start, 4))
+    move_nodes.append(stats.nodes)
+
+    piece = board.piece
+    row = drop_piece(board, column)
+    moves.append(str(column))
+    if last_move_wins(board, row, column):
+      winner = piece
+      break
+
+  return {
+    'game': game,
+    'first': first_piece,
+    'moves': ''.join(moves),
+    'winner': winner,
+    'move_times': move_times,
+    'move_nodes': move_nodes,
+  }
+
+
+def play_game_args(args):
+  return play_game(*args)
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Play bot-v-bot games without a display.')
+  parser.add_argument('--games', type=int, default=10)
+  parser.add_argument('--workers', type=int, default=multiprocessing.cpu_count())
+  parser.add_argument('--depth', type=int, default=GAME_DEPTH)
+  parser.add_argument('--move-time', type=float, default=None, help='seconds per move, overrides --depth')
+  parser.add_argument('--opening-plies', type=int, default=OPENING_PLIES, help='random moves before the bots take over')
+  parser.add_argument('--seed', type=int, default=0)
+  parser.add_argument('--table-memory', type=int, default=TABLE_MEMORY)
+  parser.add_argument('--width', type=int, default=COLUMN_COUNT)
+  parser.add_argument('--height', type=int, default=ROW_COUNT)
+  parser.add_argument('--connect', type=int, default=WINDOW_LENGTH)
+  parser.add_argument('--output', default='-', help='JSON lines file, - for stdout')
+  args = parser.parse_args()
+
+  size = (args.width, args.height, args.connect)
+  try:
+    board_config(*size)
+  except ValueError as error:
+    parser.error(str(error))
+
+  jobs = [(game, args.seed, args.depth, args.move_time, args.table_memory, args.opening_plies, size) for game in range(args.games)]
+  output = sys.stdout if args.output == '-' else open(args.output, 'w')
+  wins = {EMPTY: 0, 1: 0, 2: 0}
+
+  start = time.perf_counter()
+  with multiprocessing.Pool(args.workers) as pool:
+    for result in pool.imap_unordered(play_game_args, jobs):
+      wins[result['winner']] += 1
+      output.write(json.dumps(result, separators=(',', ':')) + '\n')
+  elapsed = time.perf_counter() - start
+
+  if output is not sys.stdout:
+    output.close()
+  print('{} games in {:.2f}s, {:.2f} games/s, red {} black {} draws {}'.format(
+    args.games, elapsed, args.games / elapsed, wins[1], wins[2], wins[EMPTY]), file=sys.stderr)
+
+
+if __name__ == '__main__':
+  main()
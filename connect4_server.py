@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+
+# Local HTTP/JSON move analysis, without pygame.
+# python connect4_server.py --port 8400
+# curl -d '{"moves": "3324"}' localhost:8400/analyze
+#
+# POST /analyze takes {"moves": "3324", "first": 1} or {"grid": rows, "piece": 2}
+# with grid rows bottom first, plus an optional "depth". Scores are for
+# the side to move, one per column with null for full columns.
+# GET /health and GET /stats report liveness and cache and batch counters.
+
+import argparse
+import collections
+import concurrent.futures
+import http.server
+import json
+import math
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+
+from connect4_engine import (EMPTY, FIRST_PIECE, SECOND_PIECE, board_from_grid,
+  create_board, drop_piece, get_valid_locations, last_move_winner,
+  winning_move)
+from connect4_evaluation import IncrementalEvaluator
+from connect4_minimax import (BLACK_BOT_PIECE, SOLVER_EMPTY_CELLS,
+  endgame_value, minimax, position_scorer)
+from connect4_ordering import MoveOrdering
+from connect4_solver import Solver
+from connect4_transposition import TranspositionTable
+
+
+HOST = '127.0.0.1'
+PORT = 8400
+ANALYSIS_DEPTH = 6
+MAX_DEPTH = 12
+CACHE_SIZE = 65536
+# Requests arriving within BATCH_WAIT seconds are sent to the pool together
+BATCH_SIZE = 32
+BATCH_WAIT = 0.002
+# Seconds a request waits for its analysis before the server gives up
+REQUEST_TIMEOUT = 60.0
+WORKER_TABLE_MEMORY = 4 * 1024 * 1024
+
+_worker_table = None
+_worker_solver = None
+
+
+class AnalysisTimeout(Exception):
+  pass
+
+
+def analyze_position(board, depth, table=None, solver=None):
+  # Scores every column for the side to move. Positions near the end are
+  # solved exactly, anything else gets a depth limited search per column.
+  piece = board.piece
+  maximizingPlayer = piece == BLACK_BOT_PIECE
+  sign = 1 if maximizingPlayer else -1
+  config = board.config
+  empty_cells = config.cells - board.moves
+
+  if empty_cells <= SOLVER_EMPTY_CELLS:
+    if solver is None:
+      solver = Solver()
+    scores = [None if score is None else sign * endgame_value(score, piece) for score in solver.solve_columns(board)]
+    depth = empty_cells
+    solved = True
+  else:
+    if table is not None:
+      table.new_search()
+    evaluator = IncrementalEvaluator(position_scorer(config), board)
+    ordering = MoveOrdering()
+    scores = [None] * config.column_count
+    for column in get_valid_locations(board):
+      row = drop_piece(board, column)
+      evaluator.drop(row, column, piece)
+      value = minimax(board, depth - 1, -math.inf, math.inf, not maximizingPlayer, table=table, ordering=ordering, evaluator=evaluator, root=False)[1]
+      evaluator.undo(row, column, piece)
+      board.undo()
+      scores[column] = sign * value
+    solved = False
+
+  valid_locations = [column for column in range(config.column_count) if scores[column] is not None]
+  best_column = max(valid_locations, key=lambda column: (scores[column], -config.center_rank[column]))
+  return {
+    'column': best_column,
+    'score': scores[best_column],
+    'column_scores': scores,
+    'depth': depth,
+    'solved': solved,
+    'to_move': piece,
+  }
+
+
+def mirror_result(result):
+  # The analysis of the mirrored position
+  mirrored = dict(result)
+  mirrored['column'] = len(result['column_scores']) - 1 - result['column']
+  mirrored['column_scores'] = result['column_scores'][::-1]
+  return mirrored
+
+
+def analyze_batch(jobs):
+  global _worker_table, _worker_solver
+  if _worker_table is None:
+    _worker_table = TranspositionTable(WORKER_TABLE_MEMORY)
+    # Solved scores are exact, so the solver's table can carry over
+    _worker_solver = Solver()
+  results = []
+  for board, depth in jobs:
+    # Entries left by earlier requests would make a result depend on which
+    # worker got it and what it searched before, and the cache keeps it
+    _worker_table.clear()
+    results.append(analyze_position(board, depth, _worker_table, _worker_solver))
+  return results
+
+
+def parse_position(request):
+  if 'grid' in request:
+    piece = request.get('piece')
+    if isinstance(piece, bool) or piece not in (None, FIRST_PIECE, SECOND_PIECE):
+      raise ValueError('piece must be {} or {}'.format(FIRST_PIECE, SECOND_PIECE))
+    grid = request['grid']
+    if not isinstance(grid, list) or not all(isinstance(row, list) and all(isinstance(cell, int) for cell in row) for row in grid):
+      raise ValueError('grid must be a list of rows of pieces')
+    board = board_from_grid(grid, piece)
+  else:
+    first = request.get('first', FIRST_PIECE)
+    if isinstance(first, bool) or first not in (FIRST_PIECE, SECOND_PIECE):
+      raise ValueError('first must be {} or {}'.format(FIRST_PIECE, SECOND_PIECE))
+    moves = request.get('moves', '')
+    if not isinstance(moves, str):
+      raise ValueError('moves must be a string of column digits')
+    board = create_board(first)
+    for move in moves:
+      if last_move_winner(board) != EMPTY:
+        raise ValueError('moves continue after the game was won')
+      if not move.isdigit() or int(move) >= board.config.column_count or not board.can_play(int(move)):
+        raise ValueError('illegal move {!r}'.format(move))
+      board.play(int(move))
+
+  if winning_move(board, FIRST_PIECE) or winning_move(board, SECOND_PIECE):
+    raise ValueError('the game is already won')
+  if not get_valid_locations(board):
+    raise ValueError('the board is full')
+  return board
+
+
+class LRUCache:
+
+  def __init__(self, size):
+    self.size = size
+    self.entries = collections.OrderedDict()
+    self.lock = threading.Lock()
+    self.hits = 0
+    self.misses = 0
+
+  def get(self, key):
+    with self.lock:
+      value = self.entries.get(key)
+      if value is None:
+        self.misses += 1
+        return None
+      self.entries.move_to_end(key)
+      self.hits += 1
+      return value
+
+  def put(self, key, value):
+    with self.lock:
+      self.entries[key] = value
+      self.entries.move_to_end(key)
+      while len(self.entries) > self.size:
+        self.entries.popitem(last=False)
+
+  def stats(self):
+    with self.lock:
+      lookups = self.hits + self.misses
+      return {
+        'size': len(self.entries),
+        'capacity': self.size,
+        'hits': self.hits,
+        'misses': self.misses,
+        'hit_rate': self.hits / lookups if lookups else 0.0,
+      }
+
+
+class PendingAnalysis:
+
+  def __init__(self, board, depth):
+    self.board = board
+    self.depth = depth
+    key, self.mirrored = board.canonical_hash()
+    self.key = (key, depth)
+    self.done = threading.Event()
+    self.result = None
+    self.error = None
+
+
+class AnalysisService:
+  # Request threads queue positions and wait; one batching thread gathers
+  # them into batches, drops duplicates and spreads each batch over the
+  # process pool in one task per worker. A pool broken by a dead worker is
+  # replaced, failing only the requests it was running.
+
+  def __init__(self, executor, workers, cache_size=CACHE_SIZE, batch_size=BATCH_SIZE, batch_wait=BATCH_WAIT, timeout=REQUEST_TIMEOUT):
+    self.executor = executor
+    self.workers = workers
+    self.cache = LRUCache(cache_size)
+    self.batch_size = batch_size
+    self.batch_wait = batch_wait
+    self.timeout = timeout
+    self.queue = queue.Queue()
+    self.batches = 0
+    self.batched_positions = 0
+    self.pool_restarts = 0
+    self.thread = threading.Thread(target=self.run_batches, daemon=True)
+    self.thread.start()
+
+  def analyze(self, board, depth):
+    # Returns (result, cached). A position and its mirror share a cache
+    # entry, stored as seen from the smaller of their hashes.
+    key, mirrored = board.canonical_hash()
+    result = self.cache.get((key, depth))
+    if result is not None:
+      return mirror_result(result) if mirrored else result, True
+    pending = PendingAnalysis(board, depth)
+    self.queue.put(pending)
+    if not pending.done.wait(self.timeout):
+      raise AnalysisTimeout('analysis took longer than {:g}s'.format(self.timeout))
+    if pending.error is not None:
+      raise pending.error
+    return pending.result, False
+
+  def next_batch(self):
+    batch = [self.queue.get()]
+    deadline = time.perf_counter() + self.batch_wait
+    while len(batch) < self.batch_size:
+      remaining = deadline - time.perf_counter()
+      if remaining <= 0:
+        break
+      try:
+        batch.append(self.queue.get(timeout=remaining))
+      except queue.Empty:
+        break
+    return batch
+
+  def run_batches(self):
+    while True:
+      groups = {}
+      for pending in self.next_batch():
+        groups.setdefault(pending.key, []).append(pending)
+      self.batches += 1
+      self.batched_positions += len(groups)
+
+      groups = list(groups.values())
+      chunks = min(self.workers, len(groups))
+      for start in range(chunks):
+        chunk = groups[start::chunks]
+        jobs = [(group[0].board, group[0].depth) for group in chunk]
+        try:
+          future = self.submit(jobs)
+        except Exception as error:
+          self.fail(chunk, error)
+          continue
+        future.add_done_callback(lambda future, chunk=chunk: self.finish(chunk, future))
+
+  def submit(self, jobs):
+    # A worker that died since the last batch only shows up here, and these
+    # jobs had no part in it, so they go to a fresh pool instead of failing
+    try:
+      return self.executor.submit(analyze_batch, jobs)
+    except concurrent.futures.BrokenExecutor:
+      self.restart_pool()
+      return self.executor.submit(analyze_batch, jobs)
+
+  def restart_pool(self):
+    # Called from the batching thread only, so submits never race it
+    self.executor.shutdown(wait=False, cancel_futures=True)
+    self.executor = concurrent.futures.ProcessPoolExecutor(self.workers)
+    self.pool_restarts += 1
+
+  def fail(self, chunk, error):
+    for group in chunk:
+      for pending in group:
+        pending.error = error
+        pending.done.set()
+
+  def finish(self, chunk, future):
+    try:
+      results = future.result()
+    except Exception as error:
+      self.fail(chunk, error)
+      return
+    for group, result in zip(chunk, results):
+      # Mirrored requests share a group, so each gets its own orientation
+      if group[0].mirrored:
+        result = mirror_result(result)
+      self.cache.put(group[0].key, result)
+      for pending in group:
+        pending.result = mirror_result(result) if pending.mirrored else result
+        pending.done.set()
+
+  def stats(self):
+    return {
+      'cache': self.cache.stats(),
+      'batches': self.batches,
+      'batched_positions': self.batched_positions,
+      'mean_batch_size': self.batched_positions / self.batches if self.batches else 0.0,
+      'queued': self.queue.qsize(),
+      'pool_restarts': self.pool_restarts,
+    }
+
+
+class AnalysisHandler(http.server.BaseHTTPRequestHandler):
+  # The server object carries the service and the default depth
+
+  def send_json(self, status, body):
+    data = json.dumps(body, separators=(',', ':')).encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def do_GET(self):
+    if self.path == '/health':
+      self.send_json(200, {'status': 'ok'})
+    elif self.path == '/stats':
+      self.send_json(200, self.server.service.stats())
+    else:
+      self.send_json(404, {'error': 'not found'})
+
+  def do_POST(self):
+    if self.path != '/analyze':
+      self.send_json(404, {'error': 'not found'})
+      return
+    try:
+      length = int(self.headers.get('Content-Length', 0))
+      request = json.loads(self.rfile.read(length) or b'{}')
+      if not isinstance(request, dict):
+        raise ValueError('request must be a JSON object')
+      depth = request.get('depth', self.server.depth)
+      # bool is an int subclass, so true would otherwise search depth 1
+      if not isinstance(depth, int) or isinstance(depth, bool) or not 1 <= depth <= MAX_DEPTH:
+        raise ValueError('depth must be between 1 and {}'.format(MAX_DEPTH))
+      board = parse_position(request)
+    except ValueError as error:
+      self.send_json(400, {'error': str(error)})
+      return
+
+    try:
+      result, cached = self.server.service.analyze(board, depth)
+    except AnalysisTimeout as error:
+      self.send_json(503, {'error': str(error)})
+      return
+    except Exception as error:
+      self.send_json(500, {'error': str(error)})
+      return
+    response = dict(result)
+    response['cached'] = cached
+    self.send_json(200, response)
+
+  def log_message(self, format, *args):
+    if self.server.verbose:
+      super().log_message(format, *args)
+
+
+def create_server(host, port, service, depth=ANALYSIS_DEPTH, verbose=False):
+  server = http.server.ThreadingHTTPServer((host, port), AnalysisHandler)
+  server.daemon_threads = True
+  server.service = service
+  server.depth = depth
+  server.verbose = verbose
+  return server
+
+
+def main():
+  parser = argparse.ArgumentParser(description='Serve move analysis over HTTP.')
+  parser.add_argument('--host', default=HOST)
+  parser.add_argument('--port', type=int, default=PORT)
+  parser.add_argument('--workers', type=int, default=os.cpu_count())
+  parser.add_argument('--depth', type=int, default=ANALYSIS_DEPTH, help='default search depth')
+  parser.add_argument('--cache-size', type=int, default=CACHE_SIZE)
+  parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+  parser.add_argument('--batch-wait', type=float, default=BATCH_WAIT * 1000, help='milliseconds')
+  parser.add_argument('--timeout', type=float, default=REQUEST_TIMEOUT, help='seconds before a request gets a 503')
+  parser.add_argument('--verbose', action='store_true', help='log every request')
+  args = parser.parse_args()
+
+  executor = concurrent.futures.ProcessPoolExecutor(args.workers)
+  service = AnalysisService(executor, args.workers, args.cache_size, args.batch_size, args.batch_wait / 1000, args.timeout)
+  server = create_server(args.host, args.port, service, args.depth, args.verbose)
+  print('serving on http://{}:{}'.format(*server.server_address), file=sys.stderr)
+  # Stop on SIGTERM as on Ctrl-C, so the pool workers are shut down too
+  signal.signal(signal.SIGTERM, signal.default_int_handler)
+  try:
+    server.serve_forever()
+  except KeyboardInterrupt:
+    pass
+  finally:
+    server.server_close()
+    # The service may have replaced the pool it was given
+    service.executor.shutdown(cancel_futures=True)
+
+
+if __name__ == '__main__':
+  main()
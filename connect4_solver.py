@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+
+from connect4_engine import DEFAULT_CONFIG, winning_cells
+from connect4_transposition import TranspositionTable, UPPER_BOUND
+
+
+BOARD_CELLS = DEFAULT_CONFIG.cells
+SOLVER_TABLE_MEMORY = 4 * 1024 * 1024
+
+
+class Solver:
+  # Exact solver using negamax with null-window probes over raw bitboards.
+  # Scores are for the side to move: 0 is a draw, a win scores one point
+  # for every stone the winner has left when it plays the winning move, and
+  # a loss is the negative of the opponent's win. Solves positions on the
+  # board size of the last board passed in, clearing the table on a change.
+
+  def __init__(self, memory_bytes=SOLVER_TABLE_MEMORY, config=DEFAULT_CONFIG):
+    self.table = TranspositionTable(memory_bytes)
+    self.nodes = 0
+    self.config = config
+
+  def use_config(self, config):
+    if config is not self.config:
+      self.table.clear()
+      self.config = config
+
+  def negamax(self, current, mask, moves, alpha, beta):
+    # The side to move cannot win immediately; solve() checks that first
+    self.nodes += 1
+    config = self.config
+    cells = config.cells
+    possible = (mask + config.bottom_mask) & config.board_mask
+    opponent_wins = winning_cells(current ^ mask, mask, config)
+    forced = possible & opponent_wins
+    if forced:
+      if forced & (forced - 1):
+        # Two threats to block at once
+        return -((cells - moves) // 2)
+      possible = forced
+    # Never play directly below an opponent's winning cell
+    possible &= ~(opponent_wins >> 1)
+    if not possible:
+      return -((cells - moves) // 2)
+    if moves >= cells - 2:
+      return 0
+
+    lowest = -((cells - 2 - moves) // 2)
+    if alpha < lowest:
+      alpha = lowest
+      if alpha >= beta:
+        return alpha
+    highest = (cells - 1 - moves) // 2
+    # A position and its mirror have the same score, so share the smaller key
+    key = current + mask
+    mirrored = config.mirror_bits(key)
+    if mirrored < key:
+      key = mirrored
+    entry = self.table.lookup(key)
+    if entry is not None:
+      highest = entry[1]
+    if beta > highest:
+      beta = highest
+      if alpha >= beta:
+        return beta
+
+    # Moves creating the most new threats first, ties center-out
+    candidates = []
+    column_masks = config.column_masks
+    for column in config.center_order:
+      move = possible & column_masks[column]
+      if move:
+        threats = winning_cells(current | move, mask, config).bit_count()
+        candidates.append((-threats, len(candidates), move))
+    candidates.sort()
+
+    for threats, rank, move in candidates:
+      score = -self.negamax(current ^ mask, mask | move, moves + 1, -beta, -alpha)
+      if score >= beta:
+        return score
+      if score > alpha:
+        alpha = score
+
+    self.table.store(key, 0, alpha, UPPER_BOUND, None)
+    return alpha
+
+  def solve(self, board):
+    config = board.config
+    self.use_config(config)
+    current = board.current
+    mask = board.mask
+    moves = board.moves
+    if winning_cells(current, mask, config) & (mask + config.bottom_mask) & config.board_mask:
+      return (config.cells + 1 - moves) // 2
+
+    low = -((config.cells - moves) // 2)
+    high = (config.cells + 1 - moves) // 2
+    while low < high:
+      middle = low + (high - low) // 2
+      # Probe near zero first, where most positions end up
+      if middle <= 0 and int(low / 2) < middle:
+        middle = int(low / 2)
+      elif middle >= 0 and int(high / 2) > middle:
+        middle = int(high / 2)
+      result = self.negamax(current, mask, moves, middle, middle + 1)
+      if result <= middle:
+        high = result
+      else:
+        low = result
+    return low
+
+  def solve_columns(self, board):
+    # Score of every column for the side to move, None where it is full
+    config = board.config
+    scores = [None] * config.column_count
+    wins = winning_cells(board.current, board.mask, config)
+    for column in range(config.column_count):
+      if not board.can_play(column):
+        continue
+      if wins & (board.mask + config.bottom_mask) & config.column_masks[column]:
+        scores[column] = (config.cells + 1 - board.moves) // 2
+      elif board.moves + 1 == config.cells:
+        scores[column] = 0
+      else:
+        board.play(column)
+        scores[column] = -self.solve(board)
+        board.undo()
+    return scores
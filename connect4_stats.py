@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import time
+
+
+class SearchStats:
+  # Counters filled in by minimax when passed as its stats argument.
+  # nodes_by_depth is keyed by remaining search depth, so deeper entries
+  # are closer to the root.
+
+  def __init__(self):
+    self.started = time.perf_counter()
+    self.elapsed = 0.0
+    self.nodes_by_depth = {}
+    self.cutoffs = 0
+    self.first_move_cutoffs = 0
+    self.leaf_evaluations = 0
+    self.terminal_hits = 0
+    self.table_cutoffs = 0
+    self.depth = 0
+
+  def finish(self):
+    self.elapsed = time.perf_counter() - self.started
+
+  @property
+  def nodes(self):
+    return sum(self.nodes_by_depth.values())
+
+  @property
+  def first_move_cutoff_rate(self):
+    return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+  @property
+  def nodes_per_second(self):
+    return self.nodes / self.elapsed if self.elapsed else 0.0
+
+  def as_dict(self):
+    return {
+      'depth': self.depth,
+      'elapsed': round(self.elapsed, 6),
+      'nodes': self.nodes,
+      'nodes_per_second': round(self.nodes_per_second, 1),
+      'nodes_by_depth': {str(depth): count for depth, count in sorted(self.nodes_by_depth.items())},
+      'cutoffs': self.cutoffs,
+      'first_move_cutoffs': self.first_move_cutoffs,
+      'first_move_cutoff_rate': round(self.first_move_cutoff_rate, 4),
+      'leaf_evaluations': self.leaf_evaluations,
+      'terminal_hits': self.terminal_hits,
+      'table_cutoffs': self.table_cutoffs,
+    }
+
+
+def log_stats(stats, logger, **fields):
+  # One JSON object per search, with any extra fields such as the position
+  record = dict(fields)
+  record.update(stats.as_dict())
+  logger.info(json.dumps(record, separators=(',', ':')))
+
+
+def format_labels(labels):
+  if not labels:
+    return ''
+  return '{' + ','.join('{}="{}"'.format(key, value) for key, value in sorted(labels.items())) + '}'
+
+
+def prometheus_text(stats, labels=None):
+  labels = dict(labels or {})
+  label_text = format_labels(labels)
+  lines = []
+  metrics = [
+    ('connect4_search_seconds', 'gauge', 'Wall-clock time of the last search', stats.elapsed),
+    ('connect4_search_depth', 'gauge', 'Deepest completed search depth', stats.depth),
+    ('connect4_search_cutoffs', 'gauge', 'Beta cutoffs in the last search', stats.cutoffs),
+    ('connect4_search_first_move_cutoff_rate', 'gauge', 'Share of cutoffs caused by the first move searched', stats.first_move_cutoff_rate),
+    ('connect4_search_leaf_evaluations', 'gauge', 'Leaf evaluations in the last search', stats.leaf_evaluations),
+    ('connect4_search_terminal_hits', 'gauge', 'Won, lost or drawn positions reached in the last search', stats.terminal_hits),
+    ('connect4_search_table_cutoffs', 'gauge', 'Transposition table cutoffs in the last search', stats.table_cutoffs),
+  ]
+  for name, kind, help_text, value in metrics:
+    lines.append('# HELP {} {}'.format(name, help_text))
+    lines.append('# TYPE {} {}'.format(name, kind))
+    lines.append('{}{} {}'.format(name, label_text, value))
+
+  lines.append('# HELP connect4_search_nodes Nodes visited in the last search by remaining depth')
+  lines.append('# TYPE connect4_search_nodes gauge')
+  for depth, count in sorted(stats.nodes_by_depth.items()):
+    lines.append('connect4_search_nodes{} {}'.format(format_labels(dict(labels, depth=depth)), count))
+  return '\n'.join(lines) + '\n'
+
+
+def write_prometheus(stats, path, labels=None):
+  # Written to a temporary file and renamed so scrapers never see half a file
+  temporary_path = path + '.tmp'
+  with open(temporary_path, 'w') as metrics_file:
+    metrics_file.write(prometheus_text(stats, labels))
+  os.replace(temporary_path, path)
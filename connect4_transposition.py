@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+
+from array import array
+
+
+EXACT = 0
+LOWER_BOUND = 1
+UPPER_BOUND = 2
+
+NO_MOVE = -1
+
+# Bytes per slot: key, value, depth, bound, best move and generation
+ENTRY_BYTES = 8 + 8 + 1 + 1 + 1 + 1
+TABLE_MEMORY = 16 * 1024 * 1024
+
+
+class TranspositionTable:
+  # Fixed-size table of parallel arrays indexed by position hash modulo size.
+  # A slot is replaced when it is empty, holds the same position, was filled
+  # by an older search or was searched to no greater depth.
+
+  def __init__(self, memory_bytes=TABLE_MEMORY):
+    self.size = max(1, memory_bytes // ENTRY_BYTES)
+    self.keys = array('Q', bytes(8 * self.size))
+    self.values = array('q', bytes(8 * self.size))
+    self.depths = array('b', bytes(self.size))
+    self.bounds = array('b', bytes(self.size))
+    self.moves = array('b', bytes(self.size))
+    self.generations = array('B', bytes(self.size))
+    self.generation = 1
+    self.hits = 0
+    self.misses = 0
+    self.stores = 0
+    self.overwrites = 0
+
+  def new_search(self):
+    # Generation 0 marks empty slots, so skip it when wrapping around
+    self.generation = self.generation % 255 + 1
+
+  def lookup(self, key):
+    index = key % self.size
+    if self.generations[index] and self.keys[index] == key:
+      self.hits += 1
+      return self.depths[index], self.values[index], self.bounds[index], self.moves[index]
+    self.misses += 1
+    return None
+
+  def store(self, key, depth, value, bound, move):
+    index = key % self.size
+    stored_generation = self.generations[index]
+    if stored_generation and self.keys[index] != key:
+      if stored_generation == self.generation and self.depths[index] > depth:
+        return
+      self.overwrites += 1
+    self.keys[index] = key
+    self.values[index] = value
+    self.depths[index] = depth
+    self.bounds[index] = bound
+    self.moves[index] = NO_MOVE if move is None else move
+    self.generations[index] = self.generation
+    self.stores += 1
+
+  def clear(self):
+    self.generations = array('B', bytes(self.size))
+    self.generation = 1
+
+  def stats(self):
+    probes = self.hits + self.misses
+    return {
+      'size': self.size,
+      'memory_bytes': self.size * ENTRY_BYTES,
+      'hits': self.hits,
+      'misses': self.misses,
+      'hit_rate': self.hits / probes if probes else 0.0,
+      'stores': self.stores,
+      'overwrites': self.overwrites,
+    }
@@ -1,77 +1,43 @@
-import numpy as np
 import pygame
 import sys
 import math
 
+from connect4_engine import (create_board, drop_piece, is_valid_location,
+  last_move_wins, print_board)
+from connect4_records import append_game
+
 BOARD_SIZE = {'width':7, 'height':6}
 BLUE = (0,0,139)
 WHITE = (240, 250, 250)
 RED = (255, 0, 0)
 BLACK = (51, 47, 48)
 
-def create_board():
-  board = np.zeros((BOARD_SIZE['height'], BOARD_SIZE['width']))
-  return board
-
-
-def drop_piece(board, row, column, piece):
-  board[row][column] = piece
-
-
-def is_valid_location(board, column):
-  return board[BOARD_SIZE['height'] - 1][column] == 0
-  
-  
-def get_next_open_row(board, column):
-  for r in range(BOARD_SIZE['width']):
-    if board[r][column] == 0:
-      return r
-
-
-def print_board(board):
-  print(np.flip(board, 0))
+# Frames per second, the loop sleeps between frames when idle
+FPS = 30
 
-
-def winning_move(board, piece):
-  # Check horizontal locations
-  for c in range(BOARD_SIZE['width'] - 3):
-    for r in range(BOARD_SIZE['height']):
-      if board[r][c] == piece and board[r][c+1] == piece and board[r][c+2] == piece and board[r][c+3] == piece:
-        return True
-  # Check vertical locations
+def draw_board(board):
+  # Full redraw, only needed when the window is first shown
   for c in range(BOARD_SIZE['width']):
-    for r in range(BOARD_SIZE['height'] - 3):
-      if board[r][c] == piece and board[r+1][c] == piece and board[r+2][c] == piece and board[r+3][c] == piece:
-        return True
+    for r in range(BOARD_SIZE['height']):
+      draw_cell(board, r, c)
+  pygame.display.update()
 
-  # Check for positive slopes
-  for c in range(BOARD_SIZE['width'] - 3):
-    for r in range(BOARD_SIZE['height'] - 3):
-      if board[r][c] == piece and board[r+1][c+1] == piece and board[r+2][c+2] == piece and board[r+3][c+3] == piece:
-        return True
 
-  # Check for negative slopes
-  for c in range(BOARD_SIZE['width'] - 3):
-    for r in range(3, BOARD_SIZE['height']):
-      if board[r][c] == piece and board[r-1][c+1] == piece and board[r-2][c+2] == piece and board[r-3][c+3] == piece:
-        return True
+def draw_cell(board, row, column):
+  rect = pygame.Rect(column*SQUARESIZE, height - (row + 1)*SQUARESIZE, SQUARESIZE, SQUARESIZE)
+  pygame.draw.rect(screen, BLUE, rect)
+  color = WHITE
+  if board.piece_at(row, column) == 1:
+    color = BLACK
+  elif board.piece_at(row, column) == 2:
+    color = RED
+  pygame.draw.circle(screen, color, rect.center, RADIUS)
+  return rect
 
 
-def draw_board(board):
-  for c in range(BOARD_SIZE['width']):
-    for r in range(BOARD_SIZE['height']):
-      pygame.draw.rect(screen, BLUE, (c*SQUARESIZE, r*SQUARESIZE + SQUARESIZE, SQUARESIZE, SQUARESIZE) )
-      pos = ((c*SQUARESIZE+SQUARESIZE/2), (r*SQUARESIZE + SQUARESIZE+SQUARESIZE/2))
-      pygame.draw.circle(screen, WHITE, pos, RADIUS)
-      
-  for c in range(BOARD_SIZE['width']):
-    for r in range(BOARD_SIZE['height']):
-      pos = ((c*SQUARESIZE+SQUARESIZE/2), height - (r*SQUARESIZE +SQUARESIZE/2))
-      if board[r][c] == 1:
-        pygame.draw.circle(screen, BLACK, pos, RADIUS)
-      elif board[r][c] == 2:
-        pygame.draw.circle(screen, RED, pos, RADIUS)
-  pygame.display.update()
+def draw_move(board, row, column):
+  # Only the cell that changed is sent to the display
+  pygame.display.update(draw_cell(board, row, column))
 
 
 def change_turn(turn):
@@ -88,7 +54,7 @@ def change_piece_color(turn):
   else:
     pygame.draw.circle(screen, RED, (posx, int(SQUARESIZE/2)), RADIUS)
   
-  pygame.display.update()
+  pygame.display.update((0,0, width, SQUARESIZE))
 
 
 board = create_board()
@@ -110,11 +76,14 @@ size = (width, height)
 screen = pygame.display.set_mode(size)
 draw_board(board)
 pygame.draw.rect(screen, WHITE, (0,0, width, SQUARESIZE))
-pygame.display.update()
+pygame.display.update((0,0, width, SQUARESIZE))
 
 myfont = pygame.font.SysFont("cambria", 90)
+clock = pygame.time.Clock()
 
 while not game_over:
+  # Many motion events can arrive per frame; the hover row is drawn once
+  hover_moved = False
 
   for event in pygame.event.get():
     if event.type == pygame.QUIT:
@@ -122,7 +91,7 @@ while not game_over:
     
     if event.type == pygame.MOUSEMOTION:
       posx = event.pos[0]
-      change_piece_color(turn)
+      hover_moved = True
 
     if event.type == pygame.MOUSEBUTTONDOWN:
       # Get Player 1 Input
@@ -131,12 +100,11 @@ while not game_over:
         column = int(math.floor(posx / SQUARESIZE))
 
         if is_valid_location(board, column):       
-          row = get_next_open_row(board, column)
-          drop_piece(board, row, column, 1)
+          row = drop_piece(board, column)
           print_board(board)
-          draw_board(board)
+          draw_move(board, row, column)
 
-          if winning_move(board, 1):
+          if last_move_wins(board, row, column):
             game_over = True
           else:
             turn = change_turn(turn)
@@ -149,19 +117,22 @@ while not game_over:
         column = int(math.floor(posx / SQUARESIZE))
 
         if is_valid_location(board, column):       
-          row = get_next_open_row(board, column)
-          drop_piece(board, row, column, 2)
+          row = drop_piece(board, column)
           print_board(board)
-          draw_board(board)
+          draw_move(board, row, column)
 
-          if winning_move(board, 2):
+          if last_move_wins(board, row, column):
             game_over = True
           else:
             turn = change_turn(turn)
         else:
           print("Column is full, choose agin")
 
+  if hover_moved:
+    change_piece_color(turn)
+
   if game_over:
+    append_game(board)
     pygame.draw.rect(screen, WHITE, (0,0, width, SQUARESIZE))
     if turn == 0:
       font_color = BLACK
@@ -169,6 +140,8 @@ while not game_over:
       font_color = RED
     label = myfont.render("Player {} WINS!".format(turn + 1), 1, font_color)
     screen.blit(label, (40,10))
-    pygame.display.update()
+    pygame.display.update((0,0, width, SQUARESIZE))
+
+    pygame.time.wait(3000)
 
-    pygame.time.wait(3000)
\ No newline at end of file
+  clock.tick(FPS)
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+import multiprocessing
+import time
+
+from connect4_mcts import mcts
+from connect4_minimax import iterative_deepening
+from connect4_ordering import MoveOrdering
+from connect4_solver import Solver
+from connect4_stats import SearchStats
+from connect4_transposition import TranspositionTable
+
+
+_worker_table = None
+_worker_ordering = None
+_worker_solver = None
+
+
+def serve(connection):
+  while True:
+    try:
+      function, args = connection.recv()
+    except EOFError:
+      return
+    try:
+      connection.send((True, function(*args)))
+    except Exception as error:
+      connection.send((False, error))
+
+
+class BotWorker:
+  # Runs engine calls one at a time in a child process, so a pygame loop
+  # can keep handling events while the bot thinks. Functions and arguments
+  # are pickled, so they must be defined in an importable module, not in
+  # the script being run. The child is always spawned rather than forked,
+  # so it never inherits pygame's display, even when cancel() kills it
+  # mid-call and starts a fresh one after pygame.init(). A restart loses
+  # worker state such as the search table.
+
+  def __init__(self):
+    self.start()
+
+  def start(self):
+    context = multiprocessing.get_context('spawn')
+    self.connection, child_connection = context.Pipe()
+    self.process = context.Process(target=serve, args=(child_connection,), daemon=True)
+    self.process.start()
+    child_connection.close()
+    self.busy = False
+
+  def submit(self, function, *args):
+    if self.busy:
+      raise RuntimeError('the worker is still busy with the last call')
+    self.connection.send((function, args))
+    self.busy = True
+
+  def poll(self):
+    # Returns the result once the call has finished, None until then
+    if not self.busy or not self.connection.poll():
+      return None
+    self.busy = False
+    ok, result = self.connection.recv()
+    if not ok:
+      raise result
+    return result
+
+  def call(self, function, *args):
+    # Blocking call, for when the caller has nothing else to do
+    self.submit(function, *args)
+    self.connection.poll(None)
+    return self.poll()
+
+  def cancel(self):
+    if self.busy:
+      self.process.kill()
+      self.process.join()
+      self.connection.close()
+      self.start()
+
+  def close(self):
+    self.connection.close()
+    self.process.kill()
+    self.process.join()
+
+
+def search_move(board, maximizingPlayer, seconds):
+  # The table, move ordering and endgame solver live in the worker and
+  # carry over between moves
+  global _worker_table, _worker_ordering, _worker_solver
+  if _worker_table is None:
+    _worker_table = TranspositionTable()
+    _worker_ordering = MoveOrdering()
+    _worker_solver = Solver()
+  stats = SearchStats()
+  result = iterative_deepening(board, maximizingPlayer, seconds, table=_worker_table, ordering=_worker_ordering, stats=stats, solver=_worker_solver)
+  return result, stats.as_dict()
+
+
+def mcts_move(board, maximizingPlayer, seconds):
+  # search_move with the tree search; the depth slot holds the playout count
+  start = time.perf_counter()
+  result = mcts(board, maximizingPlayer, seconds)
+  elapsed = time.perf_counter() - start
+  return result, {'playouts': result[3], 'seconds': elapsed, 'playouts_per_second': result[3] / elapsed}
+
+
+def search_table_stats():
+  if _worker_table is None:
+    return None
+  return _worker_table.stats()